@@ -1,10 +1,26 @@
+import os
+import signal
+import sys
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp
 from dotenv import load_dotenv
 from config import Config
-from models import db
+from models import db, InvoiceImport, InvoiceRollup
+from pdf_cache import pdf_cache
+from jobs import run_worker
+from query_counter import query_counter
+from metrics import metrics
+from user_cache import user_cache
+from password_hashing import password_hasher
+from pdf_renderer import pdf_renderer
+from font_registry import font_registry
+from json_provider import init_json
+from compression import compression
+from search_index import rebuild_search_index
+from invoice_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, run_import
 import controllers  # yahan se blueprint import hoga
 
 # Load environment variables
@@ -13,11 +29,20 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+init_json(app)
 
 # Initialize extensions
+metrics.init_app(app)  # first: its after_request runs last, timing the other hooks too
 db.init_app(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
+pdf_cache.init_app(app)
+query_counter.init_app(app)
+user_cache.init_app(app)
+password_hasher.init_app(app)
+pdf_renderer.init_app(app)
+font_registry.init_app(app)
+compression.init_app(app)
 CORS(app, origins=app.config.get('CORS_ORIGINS', '*'))
 
 # ✅ Register all routes from controllers
@@ -30,9 +55,75 @@ def init_db():
     """Initialize the database."""
     with app.app_context():
         db.create_all()
+        # create_all builds the latest schema: record it so `flask db upgrade` starts from head
+        stamp(revision='head')
     print('✅ Database initialized!')
 
 
+# CLI command to backfill / repair the dashboard summary rollups
+@app.cli.command()
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rebuild_rollups(user_id):
+    """Recompute invoice summary rollups from the invoices table."""
+    InvoiceRollup.rebuild(user_id)
+    db.session.commit()
+    print('✅ Invoice rollups rebuilt!')
+
+
+# CLI command to backfill / repair the invoice full-text search index
+@app.cli.command()
+@click.option('--user-id', type=int, default=None, help='Only reindex this user.')
+def rebuild_search(user_id):
+    """Recompute invoice search documents from the invoices table."""
+    rebuild_search_index(user_id)
+    db.session.commit()
+    print('✅ Search index rebuilt!')
+
+
+# CLI command to bulk-import invoices (e.g. when migrating from another billing system)
+@app.cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user-id', type=int, required=True, help='Owner of the imported invoices.')
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, help='Invoices per transaction.')
+@click.option('--resume', 'resume_id', default=None, help='Continue an interrupted import by id.')
+def import_invoices(path, user_id, fmt, batch_size, resume_id):
+    """Import invoices from a CSV or JSONL file."""
+    if resume_id:
+        run = db.session.get(InvoiceImport, resume_id)
+        if run is None or run.user_id != user_id:
+            raise click.ClickException(f'Import {resume_id} not found')
+    else:
+        fmt = fmt or detect_format(path)
+        if fmt is None:
+            raise click.ClickException('Cannot tell the format from the file name, pass --format')
+        run = InvoiceImport(user_id=user_id, source=os.path.basename(path), format=fmt)
+        db.session.add(run)
+        db.session.commit()
+    print(f'📥 Import {run.id} started')
+    
+    report = lambda run: print(f'   {run.records_read} read, {run.imported_count} imported, '
+                               f'{run.failed_count} failed')
+    with open(path, 'rb') as fh:
+        run_import(run, fh, batch_size=batch_size, progress=report)
+    for error in run.errors or []:
+        print(f"   row {error['row']}: {error['error']}")
+    print(f'✅ Imported {run.imported_count} invoices ({run.failed_count} failed)')
+
+
+# CLI command to process background PDF render jobs
+@app.cli.command()
+@click.option('--poll-interval', default=1.0, help='Seconds to wait when the queue is empty.')
+@click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+def render_worker(poll_interval, once):
+    """Run the background PDF render worker."""
+    print('🖨️  Render worker started')
+    # Exit normally on SIGTERM so the worker's shutdown (metrics flush) runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    run_worker(poll_interval=poll_interval, once=once)
+
+
 # Run application
 if __name__ == '__main__':
     with app.app_context():
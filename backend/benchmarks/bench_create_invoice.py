@@ -0,0 +1,94 @@
+"""
+Create/update latency for invoices with many line items.
+
+Compares POST /api/invoices (batched executemany insert) with the old
+one-ORM-object-per-line path, at 10, 1k and 50k items by default, plus a
+PUT that replaces every line and a PUT that edits a single line by id.
+
+    python benchmarks/bench_create_invoice.py --sizes 10 1000 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000])
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = args.url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+    from models import db, User, Invoice, InvoiceItem
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='bench@bench.test', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    client = app.test_client()
+
+    def legacy_create(items):
+        # The pre-batching code path: one InvoiceItem object and session.add per line
+        with app.app_context():
+            invoice = Invoice(invoice_number=f"LEGACY-{time.time_ns()}", user_id=user_id,
+                              client_name='Legacy')
+            db.session.add(invoice)
+            db.session.flush()
+            for item_data in items:
+                item = InvoiceItem(invoice_id=invoice.id, description=item_data['description'],
+                                   quantity=int(item_data['quantity']),
+                                   unit_price=float(item_data['unit_price']))
+                item.calculate_total()
+                db.session.add(item)
+            db.session.flush()
+            invoice.calculate_totals()
+            db.session.commit()
+
+    print(f"{'items':>7} {'legacy create':>14} {'POST create':>12} {'PUT replace':>12} {'PUT 1 line':>12}")
+    for size in args.sizes:
+        items = [{'description': f"Timesheet line {n}", 'quantity': 1 + n % 5, 'unit_price': 42.5}
+                 for n in range(size)]
+
+        start = time.perf_counter()
+        legacy_create(items)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post('/api/invoices', headers=headers,
+                               json={'client_name': 'Bench', 'items': items})
+        create_s = time.perf_counter() - start
+        assert response.status_code == 201, response.get_json()
+        invoice_id = response.get_json()['invoice']['id']
+
+        start = time.perf_counter()
+        response = client.put(f"/api/invoices/{invoice_id}", headers=headers, json={'items': items})
+        update_s = time.perf_counter() - start
+        assert response.status_code == 200, response.get_json()
+
+        edited = response.get_json()['invoice']['items']
+        edited[0] = dict(edited[0], quantity=edited[0]['quantity'] + 1)
+        start = time.perf_counter()
+        response = client.put(f"/api/invoices/{invoice_id}", headers=headers, json={'items': edited})
+        edit_s = time.perf_counter() - start
+        assert response.status_code == 200, response.get_json()
+
+        print(f"{size:>7} {legacy_s * 1000:>12.1f}ms {create_s * 1000:>10.1f}ms "
+              f"{update_s * 1000:>10.1f}ms {edit_s * 1000:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
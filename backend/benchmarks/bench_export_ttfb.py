@@ -0,0 +1,105 @@
+"""
+Time-to-first-byte, total time and peak memory of the streaming export.
+
+Seeds one user with --invoices invoices of --items lines each, then
+downloads GET /api/invoices/export as CSV and JSONL, next to the
+materialize-then-jsonify approach (load every invoice with its items and
+serialize the whole list) for comparison.
+
+    python benchmarks/bench_export_ttfb.py --invoices 20000 --items 10 [--memory]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=20000)
+    parser.add_argument('--items', type=int, default=10, help='line items per invoice')
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    parser.add_argument('--memory', action='store_true',
+                        help='also report peak Python memory (tracemalloc slows everything down)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = args.url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from datetime import date, datetime, timedelta
+    from flask import jsonify
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import insert
+    from sqlalchemy.orm import selectinload
+    from app import app
+    from models import db, User, Invoice, InvoiceItem
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='bench@bench.test', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+
+        start = datetime(2024, 1, 1)
+        for offset in range(0, args.invoices, 1000):
+            count = min(1000, args.invoices - offset)
+            db.session.execute(insert(Invoice), [{
+                'id': offset + n + 1, 'user_id': user_id, 'invoice_number': f"INV-{offset + n + 1:07d}",
+                'client_name': f"Client {n % 97}", 'client_email': 'billing@example.com',
+                'invoice_date': date(2024, 1, 1) + timedelta(days=(offset + n) % 700),
+                'subtotal': 100.0, 'tax_rate': 10.0, 'tax_amount': 10.0, 'total': 110.0,
+                'created_at': start + timedelta(minutes=offset + n),
+            } for n in range(count)])
+            db.session.execute(insert(InvoiceItem), [{
+                'invoice_id': offset + n + 1, 'description': f"Consulting hours, week {k}",
+                'quantity': 1, 'unit_price': 100.0 / args.items, 'total': 100.0 / args.items,
+            } for n in range(count) for k in range(args.items)])
+            db.session.commit()
+
+    def materialized():
+        # Everything in memory before the first byte: the pattern the export replaces
+        with app.test_request_context():
+            invoices = Invoice.query.filter_by(user_id=user_id) \
+                .options(selectinload(Invoice.items)).order_by(Invoice.created_at).all()
+            body = jsonify([invoice.to_dict(include_items=True) for invoice in invoices]).get_data()
+            db.session.remove()
+            return [body]
+
+    def streamed(fmt):
+        client = app.test_client()
+        response = client.get(f"/api/invoices/export?format={fmt}", headers=headers, buffered=False)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.response
+
+    print(f"{args.invoices} invoices x {args.items} items\n")
+    print(f"{'export':<22} {'TTFB ms':>9} {'total s':>9} {'MB':>8} {'peak MB':>9}")
+    for name, run in (('csv (streamed)', lambda: streamed('csv')),
+                      ('jsonl (streamed)', lambda: streamed('jsonl')),
+                      ('json (materialized)', materialized)):
+        if args.memory:
+            tracemalloc.start()
+        begin = time.perf_counter()
+        first = None
+        size = 0
+        for chunk in run():
+            if first is None:
+                first = time.perf_counter() - begin
+            size += len(chunk)
+        total = time.perf_counter() - begin
+        peak = '-'
+        if args.memory:
+            peak = f"{tracemalloc.get_traced_memory()[1] / 2**20:.1f}"
+            tracemalloc.stop()
+        print(f"{name:<22} {first * 1000:>9.1f} {total:>9.2f} {size / 2**20:>8.1f} {peak:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Query plans and latency for the per-user invoice access paths, before and after
+the composite indexes (migration 1d852cb806dd).
+
+    python benchmarks/bench_invoice_indexes.py --invoices 1000000 --users 1000
+    python benchmarks/bench_invoice_indexes.py --url postgresql://localhost/invoicegen_bench
+
+The target database is dropped and re-seeded; never point this at real data.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, User, Invoice, InvoiceItem  # noqa: E402
+
+NEW_INDEXES = [
+    'ix_invoice_items_invoice_id',
+    'ix_invoices_user_id_created_at',
+    'ix_invoices_user_id_due_date',
+    'ix_invoices_user_id_status',
+]
+
+QUERIES = {
+    'list_page': (
+        "SELECT id, invoice_number, client_name, total, status, created_at FROM invoices "
+        "WHERE user_id = :user_id ORDER BY created_at DESC, id DESC LIMIT 50"
+    ),
+    'by_status': "SELECT count(*) FROM invoices WHERE user_id = :user_id AND status = 'sent'",
+    'due_soon': (
+        "SELECT id FROM invoices WHERE user_id = :user_id "
+        "AND due_date BETWEEN :day AND :day_end ORDER BY due_date"
+    ),
+    'load_items': "SELECT * FROM invoice_items WHERE invoice_id = :invoice_id",
+}
+
+
+def seed(engine, users, invoices, items_per_invoice, batch=20000):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    rng = random.Random(42)
+    now = datetime(2024, 1, 1)
+    statuses = ['draft', 'sent', 'paid']
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'id': u + 1, 'email': f"user{u}@bench.test", 'password_hash': 'x'}
+            for u in range(users)
+        ])
+
+    item_id = 1
+    for start in range(0, invoices, batch):
+        inv_rows, item_rows = [], []
+        for i in range(start, min(start + batch, invoices)):
+            created = now - timedelta(minutes=invoices - i)
+            inv_rows.append({
+                'id': i + 1, 'invoice_number': f"INV-{i + 1:08d}",
+                'user_id': rng.randint(1, users), 'client_name': f"Client {i % 997}",
+                'invoice_date': created.date(), 'due_date': created.date() + timedelta(days=30),
+                'subtotal': 100.0, 'tax_rate': 0.0, 'tax_amount': 0.0, 'total': 100.0,
+                'status': rng.choice(statuses), 'created_at': created, 'updated_at': created,
+            })
+            for _ in range(items_per_invoice):
+                item_rows.append({
+                    'id': item_id, 'invoice_id': i + 1, 'description': 'Work',
+                    'quantity': 1, 'unit_price': 100.0, 'total': 100.0,
+                })
+                item_id += 1
+        with engine.begin() as conn:
+            conn.execute(insert(Invoice), inv_rows)
+            if item_rows:
+                conn.execute(insert(InvoiceItem), item_rows)
+
+
+def set_indexes(engine, present):
+    with engine.begin() as conn:
+        for index in db.metadata.tables['invoices'].indexes | db.metadata.tables['invoice_items'].indexes:
+            if index.name in NEW_INDEXES:
+                index.drop(conn, checkfirst=True)
+                if present:
+                    index.create(conn)
+        conn.execute(text("ANALYZE"))
+
+
+def explain(conn, sql, params):
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = conn.execute(text(prefix + sql), params).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def measure(engine, params, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = explain(conn, sql, params)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {'plan': plan, 'median_ms': statistics.median(timings)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='sqlite:///bench_indexes.db')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--invoices', type=int, default=1000000)
+    parser.add_argument('--items', type=int, default=2, help='line items per invoice')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    started = time.perf_counter()
+    seed(engine, args.users, args.invoices, args.items)
+    print(f"seeded {args.invoices} invoices in {time.perf_counter() - started:.1f}s")
+
+    params = {'user_id': 1, 'invoice_id': args.invoices // 2,
+              'day': date(2023, 12, 1), 'day_end': date(2023, 12, 31)}
+
+    set_indexes(engine, present=False)
+    before = measure(engine, params, args.repeat)
+    set_indexes(engine, present=True)
+    after = measure(engine, params, args.repeat)
+
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        print(f"\n== {name}: {b['median_ms']:.3f} ms -> {a['median_ms']:.3f} ms "
+              f"({b['median_ms'] / max(a['median_ms'], 1e-6):.1f}x)")
+        print("   before: " + " | ".join(b['plan']))
+        print("   after:  " + " | ".join(a['plan']))
+
+
+if __name__ == '__main__':
+    main()
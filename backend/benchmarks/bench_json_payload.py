@@ -0,0 +1,103 @@
+"""
+Serialization time and payload size of a 10k-invoice list with items.
+
+Builds --invoices invoices of --items lines in memory (no database) and
+times to_dict + each JSON provider, then the size and cost of every
+compression encoding on the result. "flask default" is the stdlib
+provider with the pre-existing isoformat() calls in to_dict, for reference.
+
+    python benchmarks/bench_json_payload.py --invoices 10000 --items 5
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=5, help='line items per invoice')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+    from compression import brotli, compression
+    from json_provider import IsoJSONProvider, OrjsonProvider, orjson
+    from models import Invoice, InvoiceItem
+
+    start = datetime(2024, 1, 1, 9, 30)
+    invoices = []
+    for n in range(args.invoices):
+        invoice = Invoice(
+            id=n + 1, invoice_number=f"INV-{n + 1:05d}", user_id=1, client_name=f"Client {n % 97}",
+            client_email='billing@example.com', client_address='1 Main Street\nSpringfield',
+            invoice_date=date(2024, 1, 1) + timedelta(days=n % 700), due_date=date(2024, 3, 1),
+            notes='Thank you for your business', subtotal=1234.5, tax_rate=18.0, tax_amount=222.21,
+            total=1456.71, status='sent', created_at=start + timedelta(minutes=n),
+            updated_at=start + timedelta(minutes=n, seconds=7),
+        )
+        invoice.items = [InvoiceItem(id=n * args.items + k, description=f"Consulting, week {k}",
+                                     quantity=k + 1, unit_price=123.45, total=123.45 * (k + 1))
+                         for k in range(args.items)]
+        invoices.append(invoice)
+
+    def legacy_dicts():
+        # to_dict as it was: every date formatted in Python
+        rows = []
+        for invoice in invoices:
+            data = invoice.to_dict(include_items=True)
+            for key in ('invoice_date', 'due_date', 'created_at', 'updated_at'):
+                data[key] = data[key].isoformat() if data[key] else None
+            rows.append(data)
+        return {'invoices': rows}
+
+    providers = [('flask default', DefaultJSONProvider(app), legacy_dicts),
+                 ('stdlib (iso)', IsoJSONProvider(app), None)]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app), None))
+
+    with app.app_context():
+        to_dict_s, payload = best_of(args.repeat, lambda: {
+            'invoices': [invoice.to_dict(include_items=True) for invoice in invoices]})
+        legacy_s, legacy_payload = best_of(args.repeat, legacy_dicts)
+
+        print(f"{args.invoices} invoices x {args.items} items\n")
+        print(f"{'serializer':<16} {'to_dict ms':>11} {'dumps ms':>9} {'total ms':>9} {'KB':>8}")
+        body = None
+        for name, provider, build in providers:
+            data, build_s = (legacy_payload, legacy_s) if build else (payload, to_dict_s)
+            dumps_s, text = best_of(args.repeat, lambda: provider.dumps(data))
+            body = text.encode()
+            print(f"{name:<16} {build_s * 1000:>11.1f} {dumps_s * 1000:>9.1f} "
+                  f"{(build_s + dumps_s) * 1000:>9.1f} {len(body) / 1024:>8.0f}")
+
+        print(f"\n{'encoding':<16} {'ms':>9} {'KB':>8} {'ratio':>7}")
+        print(f"{'identity':<16} {0:>9.1f} {len(body) / 1024:>8.0f} {1:>7.2f}")
+        encodings = [('gzip', lambda: gzip.compress(body, compresslevel=compression.gzip_level, mtime=0))]
+        if brotli is not None:
+            encodings.append(('br', lambda: brotli.compress(body, quality=compression.brotli_quality)))
+        for name, compress in encodings:
+            elapsed, packed = best_of(args.repeat, compress)
+            print(f"{name:<16} {elapsed * 1000:>9.1f} {len(packed) / 1024:>8.0f} "
+                  f"{len(body) / len(packed):>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+In-process concurrent load driver for the main invoice endpoints.
+
+Seeds a dataset (see seed.py), then --threads Flask test clients, each
+logged in as one of the seeded users, issue a weighted mix of
+get_invoices, create_invoice, update_invoice and download_pdf for
+--duration seconds after a --warmup. Reports p50/p95/p99 latency and
+throughput per endpoint as JSON (see results.py).
+
+    python benchmarks/bench_load.py --threads 8 --duration 20 --output load.json
+    python benchmarks/bench_load.py --database-url postgresql://localhost/invoicegen_bench \\
+        --mix get_invoices=70 create_invoice=10 update_invoice=10 download_pdf=10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from results import summarize, write_results  # noqa: E402
+from seed import invoice_payload, seed_dataset  # noqa: E402
+
+DEFAULT_MIX = {'get_invoices': 50, 'create_invoice': 20, 'update_invoice': 20, 'download_pdf': 10}
+
+
+def parse_mix(values):
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+class Driver:
+    """One simulated client: a test client, a user's token and the ids it may touch"""
+
+    def __init__(self, app, headers, invoice_ids, items, rng):
+        self.client = app.test_client()
+        self.headers = headers
+        self.invoice_ids = invoice_ids  # shared per user; creates append to it
+        self.items = items
+        self.rng = rng
+
+    def get_invoices(self):
+        return self.client.get('/api/invoices?limit=20', headers=self.headers)
+
+    def create_invoice(self):
+        response = self.client.post('/api/invoices', json=invoice_payload(self.rng, self.items),
+                                    headers=self.headers)
+        if response.status_code == 201:
+            self.invoice_ids.append(response.get_json()['invoice']['id'])
+        return response
+
+    def update_invoice(self):
+        invoice_id = self.rng.choice(self.invoice_ids)
+        return self.client.put(f'/api/invoices/{invoice_id}', json=invoice_payload(self.rng, self.items),
+                               headers=self.headers)
+
+    def download_pdf(self):
+        invoice_id = self.rng.choice(self.invoice_ids)
+        return self.client.get(f'/api/invoices/{invoice_id}/pdf', headers=self.headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=None, help='default: a fresh SQLite file')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--invoices', type=int, default=500, help='seeded invoices per user')
+    parser.add_argument('--items', type=int, default=5, help='line items per invoice')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds run before measuring')
+    parser.add_argument('--mix', nargs='+', type=str, default=None, help='op=weight ... (default: 50/20/20/10)')
+    parser.add_argument('--pdf-cache', action='store_true', help='keep the rendered PDF cache enabled')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-', help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    output = args.output if args.output == '-' else os.path.abspath(args.output)
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['PDF_CACHE_DIR'] = os.path.join(workdir, 'pdf')
+    if not args.pdf_cache:
+        os.environ['PDF_CACHE_MAX_BYTES'] = '0'
+
+    from app import app
+    from controllers import issue_access_token
+    from models import db, Invoice, User
+
+    with app.app_context():
+        print(f"Seeding {args.users} users x {args.invoices} invoices x {args.items} items", file=sys.stderr)
+        user_ids = seed_dataset(args.users, args.invoices, args.items, seed=args.seed)
+        tokens = {user_id: issue_access_token(db.session.get(User, user_id)) for user_id in user_ids}
+        invoice_ids = {user_id: [] for user_id in user_ids}
+        for invoice_id, user_id in db.session.query(Invoice.id, Invoice.user_id):
+            invoice_ids[user_id].append(invoice_id)
+
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    samples = {name: [] for name in operations}
+    errors = {name: 0 for name in operations}
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def run(n):
+        rng = random.Random(args.seed * 1000 + n)
+        user_id = user_ids[n % len(user_ids)]
+        driver = Driver(app, {'Authorization': f"Bearer {tokens[user_id]}"}, invoice_ids[user_id],
+                        args.items, rng)
+        while not stop.is_set():
+            name = rng.choices(operations, weights)[0]
+            counted = measuring.is_set()  # only requests started inside the window
+            start = time.perf_counter()
+            response = getattr(driver, name)()
+            elapsed = (time.perf_counter() - start) * 1000
+            if not counted:
+                continue
+            if response.status_code >= 400:
+                errors[name] += 1
+            else:
+                samples[name].append(elapsed)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    measuring.set()
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    for name in operations:
+        results[name] = dict(summarize(samples[name], elapsed), errors=errors[name])
+    results['total'] = dict(summarize([ms for values in samples.values() for ms in values], elapsed),
+                            errors=sum(errors.values()))
+
+    print(f"\n{'operation':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}",
+          file=sys.stderr)
+    for name, summary in results.items():
+        if summary['count']:
+            print(f"{name:<16} {summary['throughput_rps']:>8.1f} {summary['p50_ms']:>8.1f} "
+                  f"{summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['errors']:>7}",
+                  file=sys.stderr)
+
+    params = {name: value for name, value in vars(args).items() if name not in ('output', 'database_url')}
+    params['mix'] = mix
+    write_results(output, 'load', params, results, database_url=database_url)
+
+
+if __name__ == '__main__':
+    main()
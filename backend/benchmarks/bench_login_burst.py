@@ -0,0 +1,90 @@
+"""
+Latency of an unrelated endpoint while a burst of logins is hashing.
+
+--threads clients log in back to back for --seconds while another thread
+times GET /api/auth/me. This is repeated for each --hash-workers cap (the
+first value should match --threads to mimic inline hashing, where every
+login hashes on its own thread).
+
+    python benchmarks/bench_login_burst.py --threads 16 --hash-workers 16 2 1
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--hash-workers', type=int, nargs='+', default=[16, 2, 1])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--method', default=None, help='PASSWORD_HASH_METHOD (default: app config)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    if args.method:
+        os.environ['PASSWORD_HASH_METHOD'] = args.method
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+    from models import db, User
+    from password_hashing import password_hasher
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='bench@bench.test')
+        user.set_password('correct horse battery staple')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user.id))}"}
+    credentials = {'email': 'bench@bench.test', 'password': 'correct horse battery staple'}
+    password_hasher.max_queue = args.threads
+
+    print(f"{args.threads} login threads, {password_hasher.method}\n")
+    print(f"{'hash workers':>12} {'logins/s':>9} {'me p50 ms':>10} {'me p95 ms':>10} {'me max ms':>10}")
+    for workers in args.hash_workers:
+        password_hasher.workers = workers
+        password_hasher._executor = None
+        stop = threading.Event()
+        logins = []
+
+        def login_loop():
+            client = app.test_client()
+            while not stop.is_set():
+                response = client.post('/api/auth/login', json=credentials)
+                assert response.status_code == 200, response.get_json()
+                logins.append(1)
+
+        threads = [threading.Thread(target=login_loop) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+
+        client = app.test_client()
+        latencies = []
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get('/api/auth/me', headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{workers:>12} {len(logins) / args.seconds:>9.1f} {statistics.median(latencies):>10.1f} "
+              f"{p95:>10.1f} {latencies[-1]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
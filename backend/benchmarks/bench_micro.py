@@ -0,0 +1,81 @@
+"""
+Microbenchmarks of the invoice hot paths at several invoice sizes.
+
+Times Invoice.to_dict(include_items=True), Invoice.calculate_totals() and
+generate_invoice_pdf() on in-memory invoices with --sizes line items (no
+database). Each sample is the mean of a loop long enough to time reliably;
+--repeat samples per case. Results are written as JSON (see results.py).
+
+    python benchmarks/bench_micro.py --sizes 1 10 50 200 --output micro.json
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from results import summarize, write_results  # noqa: E402
+from seed import invoice_payload  # noqa: E402
+
+
+def build_invoice(size, seed=0):
+    """A transient Invoice (with user) of `size` items, the same for a given seed"""
+    from invoice_helpers import parse_invoice_data
+    from models import Invoice, InvoiceItem, User
+
+    values, rows, subtotal = parse_invoice_data(invoice_payload(random.Random(seed), size))
+    invoice = Invoice(id=1, invoice_number='INV-00001', user_id=1, **values)
+    invoice.items = [InvoiceItem(id=n + 1, **row) for n, row in enumerate(rows)]
+    invoice.set_totals(subtotal)
+    user = User(id=1, email='user1@bench.test', full_name='Bench User', company_name='Bench Co',
+                phone='+1 555 0100', address='1 Bench Road\nTestville')
+    return invoice, user
+
+
+def measure(fn, repeat):
+    """Per-call times in ms: `repeat` samples, each the mean over an autoranged loop"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return [elapsed / number * 1000 for elapsed in timer.repeat(repeat=repeat, number=number)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200], help='line items')
+    parser.add_argument('--repeat', type=int, default=15, help='samples per case')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-', help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from app import app
+    from invoice_helpers import pdf_render_options
+    from pdf_generator import generate_invoice_pdf
+
+    results = {}
+    with app.app_context():
+        for size in args.sizes:
+            invoice, user = build_invoice(size, args.seed)
+            options = pdf_render_options(user)
+            cases = {
+                'to_dict': lambda: invoice.to_dict(include_items=True),
+                'calculate_totals': invoice.calculate_totals,
+                'generate_invoice_pdf': lambda: generate_invoice_pdf(invoice, user, **options),
+            }
+            for name, fn in cases.items():
+                fn()  # warm caches (themes, fonts) outside the samples
+                summary = summarize(measure(fn, args.repeat))
+                summary['ops_per_sec'] = round(1000 / summary['p50_ms'], 1)
+                results[f"{name}[{size}]"] = summary
+                print(f"{name + f'[{size}]':<28} p50 {summary['p50_ms']:>10.4f} ms  "
+                      f"p95 {summary['p95_ms']:>10.4f} ms", file=sys.stderr)
+
+    params = {name: value for name, value in vars(args).items() if name != 'output'}
+    write_results(args.output, 'micro', params, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Concurrent PDF downloads per gunicorn worker, and JSON latency meanwhile.
+
+For each profile a single gunicorn worker is started with the matching
+GUNICORN_THREADS / PDF_RENDER_MODE. --clients threads then download an
+uncached invoice PDF back to back for --seconds while another thread
+times GET /api/invoices every 50 ms.
+
+    python benchmarks/bench_pdf_concurrency.py --clients 8 --items 40
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# name: (threads, PDF_RENDER_MODE)
+PROFILES = {
+    'sync-inline': (1, 'inline'),
+    'gthread-inline': (8, 'inline'),
+    'gthread-thread': (8, 'thread'),
+    'gthread-process': (8, 'process'),
+}
+
+
+def seed(items):
+    from app import app
+    from controllers import issue_access_token
+    from models import db, Invoice, InvoiceItem, User
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='bench@bench.test', company_name='Bench Ltd', full_name='Bench')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.flush()
+        for n in range(20):
+            invoice = Invoice(invoice_number=f"INV-{n + 1:05d}", user_id=user.id, client_name=f"Client {n}",
+                              client_email='client@example.com', invoice_date=date(2024, 1, 1),
+                              due_date=date(2024, 2, 1), tax_rate=10)
+            invoice.items = [InvoiceItem(description=f"Line item {k}", quantity=k + 1, unit_price=9.5,
+                                         total=9.5 * (k + 1)) for k in range(items)]
+            invoice.set_totals(sum(item.total for item in invoice.items))
+            db.session.add(invoice)
+        db.session.commit()
+        invoice_id = Invoice.query.first().id
+        return {'Authorization': f"Bearer {issue_access_token(user)}"}, invoice_id
+
+
+def get(url, headers):
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+        status = response.status
+    return status, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, int(len(values) * p) - 1)] if values else float('nan')
+
+
+def run_profile(name, args, env, headers, invoice_id):
+    threads, mode = PROFILES[name]
+    env = dict(env, GUNICORN_WORKERS='1', GUNICORN_THREADS=str(threads), PDF_RENDER_MODE=mode)
+    base = f"http://127.0.0.1:{args.port}/api"
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f"127.0.0.1:{args.port}",
+         '--log-level', 'warning'], cwd=BACKEND, env=env)
+    try:
+        for _ in range(100):
+            try:
+                get(f"{base}/health", {})
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.1)
+        # Warm up (and start the render pool) outside the measured window
+        get(f"{base}/invoices/{invoice_id}/pdf", headers)
+
+        stop = threading.Event()
+        pdf_times, json_times, errors = [], [], []
+
+        def pdf_client():
+            while not stop.is_set():
+                try:
+                    pdf_times.append(get(f"{base}/invoices/{invoice_id}/pdf", headers)[1])
+                except urllib.error.HTTPError as e:
+                    errors.append(e.code)
+
+        def json_probe():
+            while not stop.is_set():
+                json_times.append(get(f"{base}/invoices?limit=20", headers)[1])
+                time.sleep(0.05)
+
+        clients = [threading.Thread(target=pdf_client) for _ in range(args.clients)]
+        clients.append(threading.Thread(target=json_probe))
+        for thread in clients:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in clients:
+            thread.join()
+
+        print(f"{name:<16} {len(pdf_times) / args.seconds:>7.2f} {statistics.median(pdf_times):>9.0f} "
+              f"{statistics.median(json_times):>9.1f} {percentile(json_times, 0.95):>9.1f} "
+              f"{max(json_times):>9.1f} {len(errors):>6}")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='concurrent PDF downloaders')
+    parser.add_argument('--items', type=int, default=40, help='line items on the invoice')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--render-workers', type=int, default=None, help='PDF_RENDER_WORKERS')
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               PDF_CACHE_MAX_BYTES='0')
+    if args.render_workers:
+        env['PDF_RENDER_WORKERS'] = str(args.render_workers)
+    os.environ.update(env)
+    headers, invoice_id = seed(args.items)
+
+    print(f"1 gunicorn worker, {args.clients} PDF clients, {args.items} line items, {os.cpu_count()} CPUs\n")
+    print(f"{'profile':<16} {'pdf/s':>7} {'pdf p50':>9} {'json p50':>9} {'json p95':>9} "
+          f"{'json max':>9} {'errors':>6}")
+    for name in args.profiles:
+        run_profile(name, args, env, headers, invoice_id)
+    print('\n(latencies in ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+PDF throughput per core of the Platypus and canvas engines.
+
+Renders the same in-memory invoice (see bench_micro.build_invoice) with
+each engine at --sizes line items in a single thread and reports renders
+per second and the canvas speedup. Results are written as JSON (see
+results.py).
+
+    python benchmarks/bench_pdf_engines.py --sizes 1 10 50 200 1000 --output engines.json
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_micro import build_invoice, measure  # noqa: E402
+from results import summarize, write_results  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200, 1000], help='line items')
+    parser.add_argument('--repeat', type=int, default=7, help='samples per case')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from app import app
+    from invoice_helpers import pdf_render_options
+    from pdf_generator import PDF_ENGINES, generate_invoice_pdf
+
+    results = {}
+    print(f"{'case':<22} {'p50 ms':>10} {'renders/s':>10} {'speedup':>8}", file=sys.stderr)
+    with app.app_context():
+        for size in args.sizes:
+            invoice, user = build_invoice(size, args.seed)
+            options = dict(pdf_render_options(user), engine=None)
+            baseline = None
+            for engine in PDF_ENGINES:
+                options['engine'] = engine
+                generate_invoice_pdf(invoice, user, **options)  # warm caches outside the samples
+                summary = summarize(measure(lambda: generate_invoice_pdf(invoice, user, **options), args.repeat))
+                summary['ops_per_sec'] = round(1000 / summary['p50_ms'], 1)
+                baseline = baseline or summary['p50_ms']
+                speedup = baseline / summary['p50_ms']
+                results[f"{engine}[{size}]"] = summary
+                print(f"{f'{engine}[{size}]':<22} {summary['p50_ms']:>10.2f} {summary['ops_per_sec']:>10.1f} "
+                      f"{speedup:>7.1f}x", file=sys.stderr)
+
+    if args.output:
+        params = {name: value for name, value in vars(args).items() if name != 'output'}
+        write_results(args.output, 'pdf_engines', params, results)
+
+
+if __name__ == '__main__':
+    main()
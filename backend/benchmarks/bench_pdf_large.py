@@ -0,0 +1,66 @@
+"""
+Render time and peak memory of very long invoices, standard vs large table.
+
+Each case renders once in a fresh spawned process; peak memory is the
+growth of the process's max RSS during the render (so it includes
+ReportLab's C-level buffers, unlike tracemalloc). The standard layout is
+skipped above --standard-max lines, where it takes minutes.
+
+    python benchmarks/bench_pdf_large.py --sizes 100 1000 10000 50000 --output large.json
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from results import write_results  # noqa: E402
+
+
+def render_case(size, large_table):
+    """Runs in a child process: returns (seconds, peak RSS growth in MB, PDF bytes)"""
+    from bench_pdf_styles import sample_invoice
+    from pdf_generator import generate_invoice_pdf
+
+    generate_invoice_pdf(*sample_invoice(1))  # imports, fonts and theme outside the measurement
+    invoice, user = sample_invoice(size)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    pdf = generate_invoice_pdf(invoice, user, large_table=large_table)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return seconds, (peak - before) / 1024, len(pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000], help='line items')
+    parser.add_argument('--standard-max', type=int, default=10000, help='largest size rendered the standard way')
+    parser.add_argument('--output', default=None, help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    print(f"{'case':<22} {'seconds':>9} {'ms/line':>8} {'peak MB':>8} {'PDF KB':>8}", file=sys.stderr)
+    for size in args.sizes:
+        for mode, large_table in (('standard', False), ('large', True)):
+            if not large_table and size > args.standard_max:
+                continue
+            with context.Pool(1) as pool:
+                seconds, peak_mb, pdf_bytes = pool.apply(render_case, (size, large_table))
+            case = f"{mode}[{size}]"
+            results[case] = {'seconds': round(seconds, 3), 'peak_mb': round(peak_mb, 1), 'pdf_bytes': pdf_bytes}
+            print(f"{case:<22} {seconds:>9.2f} {seconds / size * 1000:>8.2f} {peak_mb:>8.1f} "
+                  f"{pdf_bytes / 1024:>8.0f}", file=sys.stderr)
+
+    if args.output:
+        params = {'sizes': args.sizes, 'standard_max': args.standard_max}
+        write_results(args.output, 'pdf_large', params, results)
+
+
+if __name__ == '__main__':
+    main()
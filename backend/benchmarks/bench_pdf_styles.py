@@ -0,0 +1,77 @@
+"""
+Microbenchmark: per-render cost of compiling PDF styles vs reusing the theme registry.
+
+    python benchmarks/bench_pdf_styles.py --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_generator  # noqa: E402
+from pdf_generator import Theme, generate_invoice_pdf, get_theme  # noqa: E402
+
+
+def sample_invoice(n_items=5):
+    items = [
+        SimpleNamespace(id=i, description=f"Consulting hours #{i}", quantity=2,
+                        unit_price=75.0, total=150.0)
+        for i in range(n_items)
+    ]
+    invoice = SimpleNamespace(
+        id=1, invoice_number="INV-00001", client_name="Bob's Bakery",
+        client_email="bob@example.com", client_address="1 Main St\nSpringfield",
+        invoice_date=date(2024, 1, 1), due_date=date(2024, 1, 31),
+        notes="Thanks for your business", subtotal=150.0 * n_items, tax_rate=10.0,
+        tax_amount=15.0 * n_items, total=165.0 * n_items, status="sent",
+        updated_at=datetime(2024, 1, 1), items=items,
+    )
+    user = SimpleNamespace(
+        company_name="Acme", full_name="Alice", email="alice@acme.test",
+        phone="555-0100", address="2 Side St", company_logo=None,
+    )
+    return invoice, user
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    invoice, user = sample_invoice()
+    theme_color = "#0ea5a4"
+
+    build_ms = timed(lambda: Theme(theme_color), args.iterations)
+    lookup_ms = timed(lambda: get_theme(theme_color), args.iterations)
+
+    def cold_render():
+        pdf_generator.get_theme.cache_clear()
+        generate_invoice_pdf(invoice, user, theme_color=theme_color)
+
+    def warm_render():
+        generate_invoice_pdf(invoice, user, theme_color=theme_color)
+
+    cold_ms = timed(cold_render, args.iterations)
+    warm_ms = timed(warm_render, args.iterations)
+
+    print(f"style compile (uncached): {build_ms:8.3f} ms")
+    print(f"style lookup (registry):  {lookup_ms:8.3f} ms")
+    print(f"render, styles rebuilt:   {cold_ms:8.3f} ms")
+    print(f"render, styles reused:    {warm_ms:8.3f} ms")
+    print(f"saved per render:         {cold_ms - warm_ms:8.3f} ms "
+          f"({(cold_ms - warm_ms) / cold_ms * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
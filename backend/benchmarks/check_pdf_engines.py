@@ -0,0 +1,343 @@
+"""
+Check that the canvas PDF engine draws the same invoice as the Platypus one.
+
+Renders a set of fixture invoices (short, logo, wrapped text, multi-page,
+large-table) with both engines and compares what ends up on each page:
+every text run (font, size, color, position), filled rectangle, stroked
+line and image, within --tolerance points. White fills are ignored (the
+page is white). Exits with status 1 on any difference.
+
+    python benchmarks/check_pdf_engines.py
+    python benchmarks/check_pdf_engines.py --fixture multipage --verbose
+    python benchmarks/check_pdf_engines.py --font Brand.ttf --bold-font Brand-Bold.ttf
+"""
+import argparse
+import base64
+import os
+import re
+import sys
+import tempfile
+import zlib
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfbase.pdfmetrics import stringWidth  # noqa: E402
+
+from pdf_generator import generate_invoice_pdf  # noqa: E402
+
+OBJECT_RE = re.compile(rb'(\d+) 0 obj\s*(.*?)\s*endobj', re.S)
+STREAM_RE = re.compile(rb'stream\r?\n(.*?)endstream', re.S)
+TOKEN_RE = re.compile(rb'\((?:\\.|[^\\)])*\)|/[^\s/\[\]()<>]+|\[|\]|<<|>>|[^\s/\[\]()<>]+', re.S)
+STRING_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+WORDS = ('design', 'consulting', 'hosting', 'support', 'audit', 'migration', 'training', 'license',
+         'maintenance', 'development', 'review', 'workshop', 'integration', 'report', 'setup')
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def make_invoice(n_items, description=None, notes='Thanks for your business', address='1 Main St\nSpringfield',
+                 user_address='2 Side St'):
+    items = []
+    for i in range(n_items):
+        text = description(i) if description else f"Consulting hours #{i}"
+        items.append(SimpleNamespace(id=i, description=text, quantity=i % 7 + 1,
+                                     unit_price=75.0 + i, total=(75.0 + i) * (i % 7 + 1)))
+    subtotal = sum(item.total for item in items)
+    invoice = SimpleNamespace(
+        id=1, invoice_number='INV-00042', client_name="Bob's Bakery",
+        client_email='bob@example.com', client_address=address,
+        invoice_date=date(2024, 1, 1), due_date=date(2024, 1, 31),
+        notes=notes, subtotal=subtotal, tax_rate=10.0, tax_amount=subtotal / 10,
+        discount=12.5, total=subtotal * 1.1 - 12.5, status='sent',
+        updated_at=datetime(2024, 1, 1), items=items,
+    )
+    user = SimpleNamespace(
+        company_name='Acme Consulting', full_name='Alice', email='alice@acme.test',
+        phone='555-0100', address=user_address, company_logo=None,
+    )
+    return invoice, user
+
+
+def long_description(i):
+    words = [WORDS[(i * 7 + k) % len(WORDS)] for k in range(5 + i % 23)]
+    return ' '.join(words).capitalize()
+
+
+def write_logo(directory):
+    from PIL import Image
+    path = os.path.join(directory, 'logo.png')
+    image = Image.new('RGB', (240, 120), (14, 165, 164))
+    for x in range(60, 180):
+        for y in range(30, 90):
+            image.putpixel((x, y), (255, 255, 255))
+    image.save(path)
+    return path
+
+
+def fixtures(workdir):
+    """name -> (invoice, user, generate_invoice_pdf keyword arguments)"""
+    logo = write_logo(workdir)
+    cases = {
+        'minimal': make_invoice(1, notes=None, address=None, user_address=None) + ({},),
+        'standard': make_invoice(5) + ({},),
+        'logo': make_invoice(3) + ({'logo_path': logo, 'theme_color': '#7c3aed'},),
+        'wrapping': make_invoice(
+            12, description=long_description,
+            notes=' '.join(WORDS * 12),
+            address='Suite 400\nA rather long street name that goes on for quite a while, 12345\n\nSpringfield',
+            user_address='42 Harbour Road, Unit 7, Industrial Estate North, Springfield 90210, United States',
+        ) + ({'currency_symbol': 'EUR '},),
+        'long_words': make_invoice(
+            4, description=lambda i: 'x' * (40 + 30 * i) + ' tail',
+        ) + ({},),
+        'multipage': make_invoice(80, description=long_description) + ({},),
+        'exact_fit': make_invoice(17) + ({},),
+        'large': make_invoice(400, description=lambda i: long_description(i) if i % 9 == 0 else f"Item #{i}")
+        + ({'large_table': True},),
+    }
+    # Push the totals and notes onto page breaks at a few different points
+    for n in (18, 19, 20, 21, 22):
+        cases[f"break_{n}"] = make_invoice(n, notes=' '.join(WORDS * 9)) + ({},)
+    return cases
+
+
+# ---------------------------------------------------------------------------
+# PDF content extraction
+# ---------------------------------------------------------------------------
+
+def _decode_stream(obj):
+    data = STREAM_RE.search(obj).group(1).rstrip(b'\r\n')
+    if b'ASCII85Decode' in obj:
+        data = base64.a85decode(data[:-2] if data.endswith(b'~>') else data)
+    if b'FlateDecode' in obj:
+        data = zlib.decompress(data)
+    return data
+
+
+def _pdf_string(token):
+    body = token[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        c = body[i:i + 1]
+        if c == b'\\':
+            nxt = body[i + 1:i + 2]
+            if nxt in STRING_ESCAPES:
+                out += STRING_ESCAPES[nxt]
+                i += 2
+            elif nxt.isdigit():
+                digits = re.match(rb'[0-7]{1,3}', body[i + 1:]).group(0)
+                out.append(int(digits, 8))
+                i += 1 + len(digits)
+            else:
+                out += nxt
+                i += 2
+        else:
+            out += c
+            i += 1
+    return out.decode('latin-1')
+
+
+def _mul(a, b):
+    """Product of two PDF matrices [a b c d e f]"""
+    return [
+        a[0] * b[0] + a[1] * b[2], a[0] * b[1] + a[1] * b[3],
+        a[2] * b[0] + a[3] * b[2], a[2] * b[1] + a[3] * b[3],
+        a[4] * b[0] + a[5] * b[2] + b[4], a[4] * b[1] + a[5] * b[3] + b[5],
+    ]
+
+
+def _point(m, x, y):
+    return m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5]
+
+
+def _color(values):
+    return tuple(round(v, 3) for v in values)
+
+
+def page_contents(pdf):
+    """One list of drawn elements per page, in page order"""
+    objects = {int(num): body for num, body in OBJECT_RE.findall(pdf)}
+    fonts = {}
+    for body in objects.values():
+        match = re.search(rb'/BaseFont /(\S+).*?/Name /(\S+)', body, re.S)
+        if match and b'/Type /Font' in body:
+            fonts[match.group(2).decode()] = match.group(1).decode()
+    root = next(body for body in objects.values() if b'/Type /Pages' in body and b'/Kids' in body)
+    kids = [int(n) for n in re.findall(rb'(\d+) 0 R', re.search(rb'/Kids \[(.*?)\]', root, re.S).group(1))]
+    pages = []
+    for kid in kids:
+        contents = re.search(rb'/Contents (\d+) 0 R', objects[kid]).group(1)
+        pages.append(interpret(_decode_stream(objects[int(contents)]), fonts))
+    return pages
+
+
+def interpret(stream, fonts):
+    """Run a content stream; returns ('text'|'rect'|'line'|'image', ...) tuples in device space"""
+    elements = []
+    state = {'ctm': [1, 0, 0, 1, 0, 0], 'fill': (0.0, 0.0, 0.0), 'stroke': (0.0, 0.0, 0.0), 'width': 1.0}
+    stack = []
+    font, size, leading = None, 0, 0
+    tm = tlm = [1, 0, 0, 1, 0, 0]
+    operands = []
+    path_rects, path_lines, current = [], [], None
+
+    for token in TOKEN_RE.findall(stream):
+        first = token[:1]
+        if first == b'(':
+            operands.append(_pdf_string(token))
+            continue
+        if first == b'/':
+            operands.append(token[1:].decode())
+            continue
+        try:
+            operands.append(float(token))
+            continue
+        except ValueError:
+            pass
+        op = token.decode('latin-1')
+        args, operands = operands, []
+        if op == 'q':
+            stack.append(dict(state))
+        elif op == 'Q':
+            state = stack.pop()
+        elif op == 'cm':
+            state['ctm'] = _mul(args, state['ctm'])
+        elif op == 'rg':
+            state['fill'] = _color(args)
+        elif op == 'RG':
+            state['stroke'] = _color(args)
+        elif op == 'g':
+            state['fill'] = _color(args * 3)
+        elif op == 'G':
+            state['stroke'] = _color(args * 3)
+        elif op == 'w':
+            state['width'] = args[0]
+        elif op == 'BT':
+            tm = tlm = [1, 0, 0, 1, 0, 0]
+        elif op == 'Tf':
+            font, size = fonts.get(args[0], args[0]), args[1]
+        elif op == 'TL':
+            leading = args[0]
+        elif op == 'Tm':
+            tm = tlm = list(args)
+        elif op in ('Td', 'TD'):
+            tm = tlm = _mul([1, 0, 0, 1, args[0], args[1]], tlm)
+            if op == 'TD':
+                leading = -args[1]
+        elif op == 'T*':
+            tm = tlm = _mul([1, 0, 0, 1, 0, -leading], tlm)
+        elif op == 'Tj':
+            x, y = _point(_mul(tm, state['ctm']), 0, 0)
+            elements.append(('text', font, size, state['fill'], args[0], x, y))
+            try:
+                tm = _mul([1, 0, 0, 1, stringWidth(args[0], font, size), 0], tm)
+            except KeyError:
+                pass  # embedded subset of a TTF: text is glyph codes, lines are one Tj anyway
+        elif op == 're':
+            x, y, w, h = args
+            x0, y0 = _point(state['ctm'], x, y)
+            x1, y1 = _point(state['ctm'], x + w, y + h)
+            path_rects.append((min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0)))
+        elif op == 'm':
+            current = _point(state['ctm'], *args)
+        elif op == 'l':
+            end = _point(state['ctm'], *args)
+            path_lines.append((current, end))
+            current = end
+        elif op in ('f', 'f*', 'F', 'B', 'B*', 'b', 'b*', 'S', 's', 'n'):
+            if op[0] in 'fFBb' and state['fill'] != (1.0, 1.0, 1.0):
+                elements.extend(('rect', state['fill']) + rect for rect in path_rects)
+            if op[0] in 'SsBb':
+                for (x0, y0), (x1, y1) in path_lines:
+                    start, end = sorted(((x0, y0), (x1, y1)))
+                    elements.append(('line', state['stroke'], state['width']) + start + end)
+            path_rects, path_lines = [], []
+        elif op == 'Do':
+            ctm = state['ctm']
+            elements.append(('image', ctm[4], ctm[5], ctm[0], ctm[3]))
+    return elements
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def _split(element):
+    """(exact key, coordinates) of an element"""
+    if element[0] == 'text':
+        return element[:5], element[5:]
+    if element[0] == 'rect':
+        return element[:2], element[2:]
+    if element[0] == 'line':
+        return element[:3], element[3:]
+    return element[:1], element[1:]
+
+
+def diff_pages(expected, actual, tolerance):
+    """Human-readable differences between two page_contents() results"""
+    problems = []
+    if len(expected) != len(actual):
+        problems.append(f"page count: platypus {len(expected)}, canvas {len(actual)}")
+    for number, (want, got) in enumerate(zip(expected, actual), 1):
+        remaining = [_split(e) for e in got]
+        missing = []
+        for element in want:
+            key, coords = _split(element)
+            for i, (other_key, other_coords) in enumerate(remaining):
+                if other_key == key and all(abs(a - b) <= tolerance for a, b in zip(coords, other_coords)):
+                    del remaining[i]
+                    break
+            else:
+                missing.append(element)
+        problems += [f"page {number}: only in platypus: {_describe(e)}" for e in missing]
+        problems += [f"page {number}: only in canvas:   {_describe(key + coords)}" for key, coords in remaining]
+    return problems
+
+
+def _describe(element):
+    return ' '.join(f"{v:.2f}" if isinstance(v, float) else repr(v) if isinstance(v, str) else str(v)
+                    for v in element)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixture', nargs='+', default=None, help='only these fixtures')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='points')
+    parser.add_argument('--verbose', action='store_true', help='list every difference')
+    parser.add_argument('--font', default=None, help='render every fixture with this TTF')
+    parser.add_argument('--bold-font', default=None, help='bold face for --font')
+    args = parser.parse_args()
+    fonts = {'font_path': args.font, 'bold_font_path': args.bold_font} if args.font else {}
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (invoice, user, options) in fixtures(workdir).items():
+            if args.fixture and name not in args.fixture:
+                continue
+            options = dict(options, **fonts)
+            expected = page_contents(generate_invoice_pdf(invoice, user, engine='platypus', **options))
+            actual = page_contents(generate_invoice_pdf(invoice, user, engine='canvas', **options))
+            problems = diff_pages(expected, actual, args.tolerance)
+            elements = sum(len(page) for page in expected)
+            if problems:
+                failed += 1
+                print(f"❌ {name}: {len(problems)} difference(s) in {len(expected)} page(s), {elements} elements")
+                for problem in problems if args.verbose else problems[:10]:
+                    print(f"     {problem}")
+            else:
+                print(f"✅ {name}: {len(expected)} page(s), {elements} elements match")
+
+    if failed:
+        print(f"\n{failed} fixture(s) differ")
+        sys.exit(1)
+    print('\nBoth engines draw the same invoices')
+
+
+if __name__ == '__main__':
+    main()
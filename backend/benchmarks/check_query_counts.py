@@ -0,0 +1,99 @@
+"""
+Guard against query-count regressions (N+1s) on the invoice endpoints.
+
+Each endpoint is exercised with a small and a large invoice; the number of
+SQL statements must stay within budget and must not grow with the item
+count. Exits non-zero on a regression, so it can run in CI.
+
+    python benchmarks/check_query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# endpoint -> maximum statements per request
+BUDGETS = {
+    'POST /invoices': 6,         # counter upsert + increment, invoice, items (RETURNING), rollup,
+                                 # search document
+    'GET /invoices': 2,          # count + max(updated_at) for the ETag, page
+    'GET /invoices (304)': 1,    # ETag query only
+    'GET /invoices/<id>': 2,     # updated_at for the ETag, invoice joined with items
+    'GET /invoices/<id> (304)': 1,
+    'GET /invoices/search': 2,   # ranked ids from the search index, invoices
+    'PUT /invoices/<id>': 8,     # invoice, item columns, bulk update, invoice update,
+                                 # rollup out + in, search document, items for response
+    'GET /invoices/<id>/pdf': 1,  # invoice joined with items (owner from the user cache)
+    'GET /auth/me': 0,           # served from the user cache
+    'DELETE /invoices/<id>': 5,  # invoice, bulk item delete, rollup, search document, invoice delete
+}
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'queries.db')}"
+    os.environ['PDF_CACHE_MAX_BYTES'] = '0'
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+    from models import db, User
+    from query_counter import count_queries
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='queries@bench.test', password_hash='x', company_name='Acme')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user.id))}"}
+
+    client = app.test_client()
+    failures = []
+    seen = {}
+
+    def check(name, size, call):
+        with count_queries() as queries:
+            response = call()
+        assert response.status_code < 400, (name, response.status_code, response.get_data(as_text=True))
+        print(f"{name:<26} items={size:<4} queries={queries.count}")
+        if seen.setdefault(name, queries.count) != queries.count:
+            failures.append(f"{name}: {seen[name]} queries with 1 item but {queries.count} with {size} (N+1)")
+        if queries.count > BUDGETS[name]:
+            failures.append(f"{name} with {size} items: {queries.count} > {BUDGETS[name]}\n    "
+                            + "\n    ".join(s.split('\n')[0][:100] for s in queries.statements))
+        return response
+
+    # Budgets assume a warm user cache, as for any but the first request of a session
+    client.get('/api/auth/me', headers=headers)
+
+    for size in (1, 50):
+        items = [{'description': f"Line {n}", 'quantity': 1, 'unit_price': 5} for n in range(size)]
+        created = check('POST /invoices', size, lambda: client.post(
+            '/api/invoices', headers=headers, json={'client_name': 'Q', 'items': items}))
+        invoice = created.get_json()['invoice']
+        url = f"/api/invoices/{invoice['id']}"
+
+        check('GET /auth/me', size, lambda: client.get('/api/auth/me', headers=headers))
+        listed = check('GET /invoices', size, lambda: client.get('/api/invoices', headers=headers))
+        check('GET /invoices (304)', size, lambda: client.get(
+            '/api/invoices', headers=dict(headers, **{'If-None-Match': listed.headers['ETag']})))
+        fetched = check('GET /invoices/<id>', size, lambda: client.get(url, headers=headers))
+        check('GET /invoices/<id> (304)', size, lambda: client.get(
+            url, headers=dict(headers, **{'If-None-Match': fetched.headers['ETag']})))
+        check('GET /invoices/search', size, lambda: client.get(
+            '/api/invoices/search?q=line', headers=headers))
+        edited = [dict(invoice['items'][0], quantity=3)] + invoice['items'][1:]
+        check('PUT /invoices/<id>', size, lambda: client.put(url, headers=headers, json={'items': edited}))
+        check('GET /invoices/<id>/pdf', size, lambda: client.get(f"{url}/pdf", headers=headers))
+        check('DELETE /invoices/<id>', size, lambda: client.delete(url, headers=headers))
+
+    if failures:
+        print("\nQuery budget exceeded:\n" + "\n".join(failures))
+        return 1
+    print("\nAll endpoints within query budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
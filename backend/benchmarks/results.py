@@ -0,0 +1,129 @@
+"""
+Machine-readable benchmark results, and a diff between two runs.
+
+bench_micro.py and bench_load.py write JSON documents of the form
+
+    {"benchmark": ..., "timestamp": ..., "environment": {...},
+     "params": {...}, "results": {"<case>": {"p50_ms": ..., ...}}}
+
+Compare two of them (exit status 1 if any case's metric got worse by more
+than --threshold percent):
+
+    python benchmarks/results.py base.json new.json --metric p95_ms --threshold 10
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# Metrics where a higher number is better; everything else is a latency
+HIGHER_IS_BETTER = {'throughput_rps', 'ops_per_sec'}
+
+
+def summarize(samples_ms, seconds=None):
+    """Latency percentiles (ms) of samples_ms; throughput if the window length is given"""
+    values = sorted(samples_ms)
+    if not values:
+        return {'count': 0}
+
+    def pct(p):
+        # nearest-rank percentile
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+    summary = {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 4),
+        'min_ms': round(values[0], 4),
+        'p50_ms': round(pct(50), 4),
+        'p95_ms': round(pct(95), 4),
+        'p99_ms': round(pct(99), 4),
+        'max_ms': round(values[-1], 4),
+    }
+    if seconds:
+        summary['throughput_rps'] = round(len(values) / seconds, 2)
+    return summary
+
+
+def environment(database_url=None):
+    """Where the numbers came from, so runs on different machines are not mixed up"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+    }
+    if database_url:
+        env['database'] = database_url.split(':', 1)[0]
+    return env
+
+
+def write_results(path, benchmark, params, results, database_url=None):
+    """Write a results document to path ('-' for stdout)"""
+    document = {
+        'benchmark': benchmark,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(database_url),
+        'params': params,
+        'results': results,
+    }
+    text = json.dumps(document, indent=2) + '\n'
+    if path == '-':
+        sys.stdout.write(text)
+    else:
+        with open(path, 'w') as fh:
+            fh.write(text)
+    return document
+
+
+def compare(base, new, metric, threshold):
+    """Print per-case change of metric; returns the cases that regressed beyond threshold"""
+    regressions = []
+    print(f"{'case':<32} {'base':>10} {'new':>10} {'change':>8}")
+    for case, result in new['results'].items():
+        before = base['results'].get(case, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            print(f"{case:<32} {'-':>10} {after if after is not None else '-':>10}")
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = '  !' if worse > threshold else ''
+        print(f"{case:<32} {before:>10.4f} {after:>10.4f} {change:>+7.1f}%{flag}")
+        if worse > threshold:
+            regressions.append(case)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--metric', default='p95_ms')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change counted as a regression')
+    args = parser.parse_args()
+
+    with open(args.base) as fh:
+        base = json.load(fh)
+    with open(args.new) as fh:
+        new = json.load(fh)
+    if base.get('benchmark') != new.get('benchmark'):
+        sys.exit(f"Different benchmarks: {base.get('benchmark')} vs {new.get('benchmark')}")
+    if base.get('params') != new.get('params'):
+        print('warning: runs used different parameters', file=sys.stderr)
+
+    regressions = compare(base, new, args.metric, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:g}% on {args.metric}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
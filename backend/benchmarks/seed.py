@@ -0,0 +1,116 @@
+"""
+Seed a reproducible benchmark dataset: N users x M invoices x K items.
+
+Writes to DATABASE_URL (an SQLite file or a local PostgreSQL). The same
+--seed always produces the same rows. Invoices go through the bulk-import
+writer, so invoice numbers, summary rollups and the search index are
+filled in exactly as in production.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/seed.py --users 10 --invoices 1000 --items 5
+    DATABASE_URL=postgresql://localhost/invoicegen_bench python benchmarks/seed.py --users 10 --invoices 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = 'bench-password'
+STATUSES = ('draft', 'sent', 'paid')
+CLIENTS = ('Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises',
+           'Wonka Industries', 'Cyberdyne', 'Soylent', 'Tyrell Corp', 'Vandelay Industries')
+WORDS = ('design', 'consulting', 'hosting', 'support', 'audit', 'migration', 'training', 'license',
+         'maintenance', 'development', 'review', 'workshop', 'integration', 'report', 'setup')
+
+
+def invoice_payload(rng, items):
+    """An API-shaped invoice (as POSTed to /api/invoices) with `items` line items"""
+    client = rng.choice(CLIENTS)
+    invoice_date = date(2023, 1, 1) + timedelta(days=rng.randrange(730))
+    return {
+        'client_name': client,
+        'client_email': f"billing@{client.split()[0].lower()}.example",
+        'client_address': f"{rng.randint(1, 999)} Market Street\nSpringfield",
+        'invoice_date': invoice_date.isoformat(),
+        'due_date': (invoice_date + timedelta(days=30)).isoformat(),
+        'notes': f"{rng.choice(WORDS).capitalize()} for {client}, net 30",
+        'tax_rate': rng.choice((0, 5, 10, 18, 20)),
+        'status': rng.choice(STATUSES),
+        'items': [{
+            'description': f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} #{k + 1}",
+            'quantity': rng.randint(1, 20),
+            'unit_price': round(rng.uniform(5, 500), 2),
+        } for k in range(items)],
+    }
+
+
+def seed_dataset(users, invoices, items, seed=0, batch_size=500, reset=True, progress=None):
+    """
+    Create the dataset in the current app's database; returns the user ids.
+
+    Must run inside an app context. With reset=True all tables are dropped
+    and recreated first.
+    """
+    from werkzeug.security import generate_password_hash
+    from invoice_helpers import parse_invoice_data
+    from invoice_import import _write_batch
+    from models import db, User
+
+    if reset:
+        db.drop_all()
+        db.create_all()
+
+    rng = random.Random(seed)
+    # Hashing is deliberately slow; every bench user shares one password hash
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    user_ids = []
+    for n in range(users):
+        user = User(email=f"user{n + 1}@bench.test", password_hash=password_hash,
+                    full_name=f"Bench User {n + 1}", company_name=f"Bench Co {n + 1}",
+                    phone='+1 555 0100', address='1 Bench Road\nTestville')
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+
+        batch = []
+        for _ in range(invoices):
+            batch.append(parse_invoice_data(invoice_payload(rng, items)))
+            if len(batch) == batch_size:
+                _write_batch(user.id, batch)
+                batch = []
+        if batch:
+            _write_batch(user.id, batch)
+        db.session.commit()
+        if progress is not None:
+            progress(n + 1)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--invoices', type=int, default=1000, help='invoices per user')
+    parser.add_argument('--items', type=int, default=5, help='line items per invoice')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        print(f"Seeding {db.engine.url.render_as_string(hide_password=True)}")
+        start = time.perf_counter()
+        seed_dataset(args.users, args.invoices, args.items, seed=args.seed, batch_size=args.batch_size,
+                     progress=lambda n: print(f"   {n}/{args.users} users"))
+        elapsed = time.perf_counter() - start
+    total = args.users * args.invoices
+    print(f"✅ {args.users} users, {total} invoices, {total * args.items} items in {elapsed:.1f}s "
+          f"(password: {BENCH_PASSWORD})")
+
+
+if __name__ == '__main__':
+    main()
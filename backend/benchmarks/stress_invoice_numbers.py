@@ -0,0 +1,122 @@
+"""
+Concurrent stress test for invoice number allocation.
+
+Several processes (like gunicorn --workers N) create invoices in parallel
+against one database through the Flask test client, then the script checks
+for duplicate numbers and reports create throughput per second.
+
+    python benchmarks/stress_invoice_numbers.py --processes 3 --invoices 200 --users 2
+    python benchmarks/stress_invoice_numbers.py --url postgresql://localhost/invoicegen_bench
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def load_app(url):
+    os.environ['DATABASE_URL'] = url
+    from app import app
+    return app
+
+
+def setup(url, users):
+    from flask_jwt_extended import create_access_token
+    from models import db, User
+
+    app = load_app(url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        tokens = []
+        for n in range(users):
+            user = User(email=f"stress{n}@bench.test")
+            user.set_password('stress')
+            db.session.add(user)
+            db.session.commit()
+            tokens.append(create_access_token(identity=str(user.id)))
+    return tokens
+
+
+def worker(url, tokens, invoices, start_at, results):
+    app = load_app(url)
+    client = app.test_client()
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    created, errors = [], Counter()
+    for n in range(invoices):
+        token = tokens[n % len(tokens)]
+        response = client.post('/api/invoices', headers={'Authorization': f'Bearer {token}'}, json={
+            'client_name': f'Client {n}',
+            'items': [{'description': 'Stress', 'quantity': 1, 'unit_price': 10}],
+        })
+        if response.status_code == 201:
+            created.append(time.time())
+        else:
+            errors[response.get_json().get('error', str(response.status_code))[:80]] += 1
+    results.put((created, dict(errors)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    parser.add_argument('--processes', type=int, default=3)
+    parser.add_argument('--invoices', type=int, default=200, help='invoices per process')
+    parser.add_argument('--users', type=int, default=1, help='users sharing the load (1 = worst case)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    url = args.url or f"sqlite:///{os.path.join(workdir, 'stress.db')}"
+    tokens = setup(url, args.users)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + 3
+    procs = [ctx.Process(target=worker, args=(url, tokens, args.invoices, start_at, results))
+             for _ in range(args.processes)]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    timestamps = sorted(ts for created, _ in outcomes for ts in created)
+    errors = Counter()
+    for _, errs in outcomes:
+        errors.update(errs)
+
+    from sqlalchemy import func
+    from models import db, Invoice
+    app = load_app(url)
+    with app.app_context():
+        duplicates = db.session.query(Invoice.user_id, Invoice.invoice_number, func.count()) \
+            .group_by(Invoice.user_id, Invoice.invoice_number).having(func.count() > 1).count()
+        total = Invoice.query.count()
+
+    elapsed = (timestamps[-1] - start_at) if timestamps else 0
+    per_second = Counter(int(ts - start_at) for ts in timestamps)
+    print(json.dumps({
+        'database': url.split(':')[0],
+        'processes': args.processes,
+        'attempted': args.processes * args.invoices,
+        'created': total,
+        'duplicate_numbers': duplicates,
+        'errors': dict(errors),
+        'elapsed_s': round(elapsed, 2),
+        'creates_per_s': round(len(timestamps) / elapsed, 1) if elapsed else None,
+        'creates_per_second_bucket': [per_second[s] for s in range(max(per_second) + 1)] if per_second else [],
+    }, indent=2))
+    return 1 if duplicates or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+from font_registry import font_registry
+from metrics import metrics
+from pdf_generator import generate_invoice_pdf
+
+_INVOICE_FIELDS = (
+    'id', 'invoice_number', 'client_name', 'client_email', 'client_address',
+    'invoice_date', 'due_date', 'notes', 'subtotal', 'tax_rate', 'tax_amount',
+    'total', 'status', 'updated_at',
+)
+_ITEM_FIELDS = ('id', 'description', 'quantity', 'unit_price', 'total')
+_USER_FIELDS = ('company_name', 'full_name', 'email', 'phone', 'address', 'company_logo')
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot(obj, fields):
+    return SimpleNamespace(**{name: getattr(obj, name) for name in fields})
+
+
+def snapshot_invoice(invoice):
+    """Detach an Invoice (and its items) into a picklable plain object"""
+    snap = _snapshot(invoice, _INVOICE_FIELDS)
+    snap.items = [_snapshot(item, _ITEM_FIELDS) for item in invoice.items]
+    return snap
+
+
+def snapshot_user(user):
+    """Detach the profile fields the PDF template reads"""
+    return _snapshot(user, _USER_FIELDS)
+
+
+def render_snapshot(invoice, user, options):
+    """Pool entry point: render one detached invoice"""
+    pdf = generate_invoice_pdf(invoice, user, **options)
+    metrics.maybe_flush()
+    return pdf
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_render_process(metrics_dir, font_paths=()):
+    """Pool process setup: report PDF phase timings after every render, load fonts up front"""
+    metrics.configure(metrics_dir, flush_interval=0)
+    font_registry.preload(font_paths)
+
+
+def get_render_pool(max_workers=None):
+    """Lazily start the process-wide PDF render pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded gunicorn worker can deadlock the child
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_render_process,
+                initargs=(metrics.directory, font_registry.preload_paths),
+            )
+        return _pool
+
+
+class _ZipStream:
+    """Write-only, non-seekable sink that zipfile writes into and we drain from"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_pdf_zip(invoices, user, options, pool, window, cache=None):
+    """
+    Yield a ZIP archive of invoice PDFs chunk by chunk.
+
+    invoices is an iterable of Invoice rows (ideally a yield_per query).
+    At most `window` renders are in flight, so memory stays bounded by a
+    few PDFs regardless of how many invoices are exported; entries are
+    written in input order. The response is already streaming, so an
+    invoice that fails to render becomes an <invoice_number>.error.txt
+    entry instead of cutting the archive short.
+    """
+    from pdf_cache import invoice_fingerprint
+
+    user = snapshot_user(user)
+    sink = _ZipStream()
+    pending = deque()
+
+    use_cache = cache is not None and cache.enabled
+
+    def submit(snap):
+        try:
+            return pool.submit(render_snapshot, snap, user, options)
+        except Exception as e:  # e.g. BrokenProcessPool
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def read_cached(snap, key):
+        cached_path = cache.get(key) if use_cache else None
+        if cached_path:
+            try:
+                with open(cached_path, 'rb') as fh:
+                    future = Future()
+                    future.set_result(fh.read())
+                    return future, False
+            except OSError:
+                # Evicted between get() and open(): render it instead
+                logger.warning('Cached PDF %s disappeared, rendering invoice %s', cached_path, snap.invoice_number)
+        return submit(snap), True
+
+    def write_entry(zf, invoice_number, key, future, rendered):
+        timestamp = datetime.utcnow().timetuple()[:6]
+        try:
+            data = future.result()
+        except Exception as e:
+            logger.exception('Bulk export: rendering invoice %s failed', invoice_number)
+            info = zipfile.ZipInfo(f"{invoice_number}.error.txt", timestamp)
+            zf.writestr(info, f"Invoice {invoice_number} could not be rendered: {e}\n",
+                        compress_type=zipfile.ZIP_DEFLATED)
+            return
+        if rendered and use_cache:
+            cache.put(key, data)
+        info = zipfile.ZipInfo(f"{invoice_number}.pdf", timestamp)
+        # PDFs are already compressed
+        zf.writestr(info, data, compress_type=zipfile.ZIP_STORED)
+
+    try:
+        with zipfile.ZipFile(sink, 'w') as zf:
+            for invoice in invoices:
+                snap = snapshot_invoice(invoice)
+                key = invoice_fingerprint(snap, user, **options)
+                future, rendered = read_cached(snap, key)
+                pending.append((snap.invoice_number, key, future, rendered))
+
+                if len(pending) >= window:
+                    write_entry(zf, *pending.popleft())
+                    yield sink.drain()
+
+            while pending:
+                write_entry(zf, *pending.popleft())
+                yield sink.drain()
+    finally:
+        # Client gone or the invoice query failed: don't leave renders queued in the pool
+        for _, _, future, _ in pending:
+            future.cancel()
+
+    yield sink.drain()
@@ -0,0 +1,75 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+    'text/css', 'application/javascript',
+)
+
+
+class Compression:
+    """
+    Compress buffered responses with brotli or gzip, as Accept-Encoding allows.
+
+    Bodies under COMPRESS_MIN_SIZE are sent as is (the headers would eat the
+    saving). Streamed and file responses are left alone. Strong ETags become
+    weak, since the bytes now depend on the negotiated encoding.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.mimetypes = set(DEFAULT_MIMETYPES)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = int(app.config.get('COMPRESS_MIN_SIZE', self.min_size))
+        self.gzip_level = int(app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level))
+        self.brotli_quality = int(app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality))
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES))
+        app.extensions['compression'] = self
+        app.after_request(self.compress_response)
+
+    @property
+    def encodings(self):
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_response(self, response):
+        if self.min_size <= 0 or response.mimetype not in self.mimetypes:
+            return response
+        if response.direct_passthrough or response.is_streamed or \
+                response.status_code < 200 or response.status_code in (204, 206, 304) or \
+                'Content-Encoding' in response.headers:
+            return response
+
+        # The body depends on Accept-Encoding whether or not this one is compressed
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = Compression()
@@ -9,6 +9,57 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///invoicegen.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+
+    # Rendered PDF cache (set PDF_CACHE_MAX_BYTES=0 to disable)
+    PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(os.getcwd(), "cache", "pdf"))
+    PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+    # Worker processes for bulk PDF rendering (default: one per CPU core)
+    PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', 0)) or None
+    
+    # Single PDF downloads: inline (on the request thread), thread or process.
+    # Pooled modes suit a threaded gunicorn worker (see gunicorn.conf.py).
+    PDF_RENDER_MODE = os.getenv('PDF_RENDER_MODE', 'inline')
+    PDF_RENDER_QUEUE_MAX = int(os.getenv('PDF_RENDER_QUEUE_MAX', 32))  # waiting renders before 503s
+    PDF_RENDER_TIMEOUT = int(os.getenv('PDF_RENDER_TIMEOUT', 60)) or None  # seconds a download waits
+    # Layout engine: platypus, or canvas (same page drawn directly, several times faster)
+    PDF_ENGINE = os.getenv('PDF_ENGINE', 'platypus')
+
+    # Invoice font: TrueType regular and bold faces (default Helvetica), loaded once per
+    # process at startup along with any other PDF_PRELOAD_FONTS (comma-separated paths)
+    PDF_FONT_PATH = os.getenv('PDF_FONT_PATH') or None
+    PDF_FONT_BOLD_PATH = os.getenv('PDF_FONT_BOLD_PATH') or None
+    PDF_PRELOAD_FONTS = os.getenv('PDF_PRELOAD_FONTS', '')
+
+    # Background render jobs (`flask render-worker`)
+    RENDER_JOB_DIR = os.getenv('RENDER_JOB_DIR', os.path.join(os.getcwd(), "cache", "jobs"))
+    RENDER_JOB_TIMEOUT = int(os.getenv('RENDER_JOB_TIMEOUT', 15 * 60))  # seconds before a running job is requeued
+    RENDER_JOB_RETENTION_HOURS = int(os.getenv('RENDER_JOB_RETENTION_HOURS', 24))
+    RENDER_JOB_PURGE_INTERVAL = int(os.getenv('RENDER_JOB_PURGE_INTERVAL', 300))  # seconds between purges of expired jobs
+    
+    # JSON responses: auto (orjson if installed), orjson or stdlib
+    JSON_SERIALIZER = os.getenv('JSON_SERIALIZER', 'auto')
+    
+    # Response compression (brotli if installed, else gzip); 0 disables
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+    
+    # Per-process cache of user profiles for authenticated requests (TTL 0 disables)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # seconds
+    USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', 10000))
+    
+    # Password hashing: werkzeug method (e.g. scrypt:32768:8:1, pbkdf2:sha256:600000).
+    # Stored hashes are upgraded to it on the next successful login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None  # default: half the CPU cores
+    PASSWORD_HASH_QUEUE_MAX = int(os.getenv('PASSWORD_HASH_QUEUE_MAX', 64))  # waiting hashes before 503s
+    
+    # Prometheus metrics (/api/metrics). Each process writes its numbers under
+    # METRICS_DIR so a scrape adds up all gunicorn workers; unset keeps them in memory.
+    METRICS_DIR = os.getenv('METRICS_DIR') or None
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))  # seconds between writes
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None  # require "Authorization: Bearer <token>" to scrape
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
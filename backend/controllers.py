@@ -1,12 +1,30 @@
 from flask import Blueprint, request, jsonify, send_file
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from datetime import datetime
-from models import db, User, Invoice, InvoiceItem
-from pdf_generator import generate_invoice_pdf
+from models import db, User, Invoice, InvoiceImport, InvoiceItem, InvoiceRollup, InvoiceSequence, RenderJob
+from pdf_cache import pdf_cache, invoice_fingerprint
+from logo_assets import normalize_logo
+from bulk_export import get_render_pool, stream_pdf_zip
+from jobs import enqueue_job
+from user_cache import user_cache
+from password_hashing import PasswordHashingBusy, password_hasher
+from pdf_renderer import PdfRenderBusy, pdf_renderer
+from metrics import metrics
+from font_registry import font_registry
+from invoice_import import IMPORT_FORMATS, detect_format, run_import
+from invoice_export import EXPORT_FORMATS, EXPORT_MIMETYPES, export_query, stream_export
+from search_index import index_invoice, parse_search_terms, remove_invoice, search_invoice_ids
+from invoice_helpers import filter_invoices, parse_date_param, parse_invoice_data, parse_items, pdf_render_options
+import base64
+import hashlib
+import hmac
 import io
 import os
-from werkzeug.utils import secure_filename
-from flask import current_app, send_from_directory
+import shutil
+from flask import current_app, send_from_directory, stream_with_context
+from sqlalchemy import delete, func, insert, tuple_, update
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 ALLOWED_LOGO_EXT = {'png', 'jpg', 'jpeg', 'gif'}
 
@@ -15,22 +33,38 @@ def allowed_file(filename):
 
 
 def save_user_logo(user_id, file):
-    """Helper function to save user logo"""
+    """Helper function to normalize and save user logo"""
     if not file or not allowed_file(file.filename):
         return None
     
-    filename = secure_filename(file.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
+    try:
+        data, digest = normalize_logo(file.stream)
+    except Exception:
+        current_app.logger.exception('Logo processing error')
+        return None
+    
     save_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'logos')
     os.makedirs(save_dir, exist_ok=True)
-    save_name = f"user_{user_id}_logo.{ext}"
+    # Content hash in the name: a new logo is a new file, so caches keyed by path stay valid
+    save_name = f"user_{user_id}_logo_{digest[:16]}.jpg"
     save_path = os.path.join(save_dir, save_name)
-    file.save(save_path)
+    with open(save_path, 'wb') as fh:
+        fh.write(data)
     
     # Return relative path
     return os.path.join('uploads', 'logos', save_name)
 
 
+def issue_access_token(user):
+    """JWT for user, stamped with the profile version it was issued for"""
+    return create_access_token(identity=str(user.id), additional_claims={'uv': user.profile_version})
+
+
+def load_current_user():
+    """The authenticated User, from the per-process profile cache when fresh"""
+    return user_cache.get(get_jwt_identity(), get_jwt().get('uv'))
+
+
 # ✅ Blueprint create karo
 bp = Blueprint("api", __name__)
 
@@ -46,7 +80,23 @@ def serve_uploads(filename):
 
 @bp.route("/health", methods=["GET"])
 def health():
-    return {'status': 'healthy'}, 200
+    return {
+        'status': 'healthy',
+        'user_cache': user_cache.stats(),
+        'password_hashing': password_hasher.stats(),
+        'pdf_rendering': pdf_renderer.stats(),
+        'fonts': font_registry.stats()
+    }, 200
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus scrape endpoint, aggregated over all worker processes"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return current_app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8',
+                                      headers={'Cache-Control': 'no-store'})
 
 
 # ==================== AUTH CONTROLLERS ====================
@@ -106,7 +156,7 @@ def signup():
         db.session.commit()
         
         # Create token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'User created successfully',
@@ -114,6 +164,9 @@ def signup():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -133,7 +186,11 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
-        access_token = create_access_token(identity=str(user.id))
+        # Move the stored hash to the current PASSWORD_HASH_METHOD while we have the password
+        if user.upgrade_password_hash(data['password']):
+            db.session.commit()
+        
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'Login successful',
@@ -141,6 +198,9 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -150,8 +210,7 @@ def login():
 def get_current_user():
     """Get current authenticated user"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = load_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -168,7 +227,8 @@ def edit_profile():
     """Edit user profile with optional logo upload"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # Always from the database: this is the write path
+        user = db.session.get(User, int(user_id))
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -218,30 +278,41 @@ def edit_profile():
             user.set_password(password)
         
         # Handle logo upload if provided
+        old_logo = None
         if logo_file:
-            # Delete old logo if exists
-            if user.company_logo:
-                old_logo_path = os.path.join(os.getcwd(), user.company_logo)
-                if os.path.exists(old_logo_path):
-                    try:
-                        os.remove(old_logo_path)
-                    except Exception as e:
-                        print(f"Error deleting old logo: {e}")
-            
-            # Save new logo
+            # Save new logo first: a rejected upload keeps the current one
             logo_path = save_user_logo(user.id, logo_file)
-            if logo_path:
-                user.company_logo = logo_path
-            else:
+            if not logo_path:
+                db.session.rollback()
                 return jsonify({'error': 'Invalid file type'}), 400
+            if user.company_logo != logo_path:
+                old_logo = user.company_logo
+            user.company_logo = logo_path
         
+        # Tokens issued from here on outdate every worker's cached copy
+        if db.session.is_modified(user):
+            user.profile_version += 1
         db.session.commit()
+        user_cache.invalidate(user.id)
+        
+        # Delete old logo once the new one is saved and committed
+        if old_logo:
+            old_logo_path = os.path.join(os.getcwd(), old_logo)
+            if os.path.exists(old_logo_path):
+                try:
+                    os.remove(old_logo_path)
+                except OSError:
+                    current_app.logger.exception('Error deleting old logo')
         
         return jsonify({
             'message': 'Profile updated successfully',
+            'access_token': issue_access_token(user),
             'user': user.to_dict()
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -249,28 +320,287 @@ def edit_profile():
 
 # ==================== INVOICE HELPERS ====================
 
-def generate_invoice_number():
-    """Generate unique invoice number"""
-    last_invoice = Invoice.query.order_by(Invoice.id.desc()).first()
-    if last_invoice:
-        num = int(last_invoice.invoice_number.split('-')[1]) + 1
-    else:
-        num = 1
+def generate_invoice_number(user_id):
+    """Generate the user's next invoice number (call inside the insert's transaction)"""
+    num = InvoiceSequence.allocate(user_id)[0]
     return f'INV-{num:05d}'
 
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(invoice):
+    """Opaque keyset cursor pointing just past this invoice in (created_at, id) order"""
+    raw = f"{invoice.created_at.isoformat()}|{invoice.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, invoice_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(invoice_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_fields_param(value):
+    """Validate ?fields=a,b,c against Invoice.PROJECTABLE_FIELDS"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = set(fields) - set(Invoice.PROJECTABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id and created_at are needed for the next cursor
+    for required in ('created_at', 'id'):
+        if required not in fields:
+            fields.insert(0, required)
+    return fields
+
+
+def wants_async():
+    """Client asked for a background render (?async=1 or Prefer: respond-async)"""
+    return request.args.get('async') in ('1', 'true') or \
+        'respond-async' in request.headers.get('Prefer', '')
+
+
+def job_accepted(job, message='Render queued', **extra):
+    """202 response pointing the client at the job status endpoint"""
+    response = jsonify({'message': message, 'job': job.to_dict(), **extra})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+
+def make_etag(*parts):
+    """Strong ETag from the values that determine a response body"""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def not_modified(etag):
+    """304 response if the client already has this ETag, else None"""
+    # Weak comparison (RFC 9110): compression hands out W/ versions of our tags
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def with_etag(response, etag):
+    """Attach the ETag and make the browser revalidate (cheaply) on every use"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def insert_items(invoice_id, rows, returning=False):
+    """
+    Write line items with a single executemany INSERT.
+    
+    With returning=True the new InvoiceItem objects are returned (ordered by
+    id, like a lazy load) via RETURNING, saving a reload when the caller
+    serializes them.
+    """
+    if not rows:
+        return []
+    for row in rows:
+        row.pop('id', None)
+        row['invoice_id'] = invoice_id
+    if returning:
+        stmt = insert(InvoiceItem).returning(InvoiceItem)
+        return sorted(db.session.scalars(stmt, rows), key=lambda item: item.id)
+    db.session.execute(insert(InvoiceItem), rows)
+    return []
+
+
+def sync_items(invoice, rows):
+    """
+    Apply a full item list to an existing invoice as a diff.
+    
+    Rows carrying an id of one of the invoice's items update it in place
+    (only if something changed), rows without an id are inserted, and
+    existing items missing from the list are deleted. Returns the change in
+    subtotal so totals can be adjusted without reloading the collection.
+    Raises ValueError for ids that do not belong to the invoice.
+    """
+    existing = {
+        row.id: row for row in db.session.query(
+            InvoiceItem.id, InvoiceItem.description, InvoiceItem.quantity,
+            InvoiceItem.unit_price, InvoiceItem.total
+        ).filter(InvoiceItem.invoice_id == invoice.id)
+    }
+    
+    delta = 0.0
+    new_rows, changed_rows, kept_ids = [], [], set()
+    for row in rows:
+        item_id = row.get('id')
+        if item_id is None:
+            new_rows.append(row)
+            delta += row['total']
+            continue
+        
+        old = existing.get(item_id)
+        if old is None or item_id in kept_ids:
+            raise ValueError(f'Unknown item id: {item_id}')
+        kept_ids.add(item_id)
+        if (old.description, old.quantity, old.unit_price) != \
+                (row['description'], row['quantity'], row['unit_price']):
+            changed_rows.append(row)
+            delta += row['total'] - old.total
+    
+    removed_ids = [item_id for item_id in existing if item_id not in kept_ids]
+    delta -= sum(existing[item_id].total for item_id in removed_ids)
+    
+    if removed_ids:
+        db.session.execute(delete(InvoiceItem).where(InvoiceItem.id.in_(removed_ids)))
+    if changed_rows:
+        db.session.execute(update(InvoiceItem), changed_rows)
+    insert_items(invoice.id, new_rows)
+    return delta
+
+
 # ==================== INVOICE ROUTES ====================
 
 @bp.route('/invoices', methods=['GET'])
 @jwt_required()
 def get_invoices():
-    """Get all invoices for current user"""
+    """Get a page of invoices for current user (newest first)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+            fields = parse_fields_param(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Any insert, edit or delete changes the count or the latest updated_at;
+        # both come from the (user_id, updated_at) index without touching rows
+        count, last_update = db.session.query(func.count(Invoice.id), func.max(Invoice.updated_at)) \
+            .filter(Invoice.user_id == user_id).one()
+        etag = make_etag('invoices', user_id, count, last_update, request.query_string.decode())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        query = Invoice.query.filter_by(user_id=user_id)
+        if cursor:
+            query = query.filter(tuple_(Invoice.created_at, Invoice.id) < cursor)
+        if fields:
+            query = query.options(load_only(*[getattr(Invoice, name) for name in fields]))
+        
+        # Fetch one extra row to know whether another page exists
+        invoices = query.order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(invoices) > limit:
+            invoices = invoices[:limit]
+            next_cursor = encode_cursor(invoices[-1])
+        
+        response = jsonify({
+            'invoices': [invoice.to_dict(fields=fields) for invoice in invoices],
+            'next_cursor': next_cursor
+        })
+        return with_etag(response, etag), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/invoices/search', methods=['GET'])
+@jwt_required()
+def search_invoices():
+    """Full-text search over client, notes and item descriptions (best match first)"""
     try:
         user_id = get_jwt_identity()
-        invoices = Invoice.query.filter_by(user_id=user_id).order_by(Invoice.created_at.desc()).all()
+        
+        try:
+            terms = parse_search_terms(request.args.get('q'))
+            limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            offset = int(request.args.get('offset', 0))
+            if limit < 1 or offset < 0:
+                raise ValueError('limit must be positive and offset non-negative')
+            fields = parse_fields_param(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One extra id tells whether another page exists
+        ids = search_invoice_ids(user_id, terms, limit + 1, offset)
+        next_offset = None
+        if len(ids) > limit:
+            ids = ids[:limit]
+            next_offset = offset + limit
+        
+        invoices = []
+        if ids:
+            query = Invoice.query.filter(Invoice.user_id == user_id, Invoice.id.in_(ids))
+            if fields:
+                query = query.options(load_only(*[getattr(Invoice, name) for name in fields]))
+            by_id = {invoice.id: invoice for invoice in query}
+            invoices = [by_id[invoice_id] for invoice_id in ids if invoice_id in by_id]
         
         return jsonify({
-            'invoices': [invoice.to_dict() for invoice in invoices]
+            'invoices': [invoice.to_dict(fields=fields) for invoice in invoices],
+            'next_offset': next_offset
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/invoices/summary', methods=['GET'])
+@jwt_required()
+def get_invoice_summary():
+    """Counts and totals by status and by month, served from the rollup table"""
+    try:
+        user_id = get_jwt_identity()
+        query = InvoiceRollup.query.filter(
+            InvoiceRollup.user_id == user_id,
+            InvoiceRollup.invoice_count > 0
+        )
+        # Rollups are monthly: a date selects the whole month it falls in
+        try:
+            if request.args.get('date_from'):
+                month_from = parse_date_param(request.args['date_from']).strftime('%Y-%m')
+                query = query.filter(InvoiceRollup.month >= month_from)
+            if request.args.get('date_to'):
+                month_to = parse_date_param(request.args['date_to']).strftime('%Y-%m')
+                query = query.filter(InvoiceRollup.month <= month_to)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
+        buckets = query.order_by(InvoiceRollup.month).all()
+        
+        by_status = {}
+        by_month = {}
+        overall = {'count': 0, 'total': 0.0}
+        for bucket in buckets:
+            for group in (by_status.setdefault(bucket.status, {'count': 0, 'total': 0.0}),
+                          by_month.setdefault(bucket.month, {'month': bucket.month, 'count': 0,
+                                                             'total': 0.0, 'by_status': {}}),
+                          overall):
+                group['count'] += bucket.invoice_count
+                group['total'] += bucket.total_amount
+            by_month[bucket.month]['by_status'][bucket.status] = {
+                'count': bucket.invoice_count,
+                'total': bucket.total_amount
+            }
+        
+        return jsonify({
+            'summary': {
+                'count': overall['count'],
+                'total': overall['total'],
+                'by_status': by_status,
+                'by_month': list(by_month.values())
+            }
         }), 200
         
     except Exception as e:
@@ -283,12 +613,24 @@ def get_invoice(invoice_id):
     """Get single invoice by ID"""
     try:
         user_id = get_jwt_identity()
-        invoice = Invoice.query.filter_by(id=invoice_id, user_id=user_id).first()
+        
+        # Every write bumps updated_at (item edits included), so it versions the whole response
+        version = db.session.query(Invoice.updated_at) \
+            .filter_by(id=invoice_id, user_id=user_id).first()
+        if version is None:
+            return jsonify({'error': 'Invoice not found'}), 404
+        etag = make_etag('invoice', invoice_id, version.updated_at)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        invoice = Invoice.query.options(joinedload(Invoice.items)) \
+            .filter_by(id=invoice_id, user_id=user_id).first()
         
         if not invoice:
             return jsonify({'error': 'Invoice not found'}), 404
         
-        return jsonify({'invoice': invoice.to_dict(include_items=True)}), 200
+        return with_etag(jsonify({'invoice': invoice.to_dict(include_items=True)}), etag), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -298,85 +640,28 @@ def get_invoice(invoice_id):
 @jwt_required()
 def create_invoice():
     """Create new invoice"""
-    print("CREATE INVOICE CALLED")
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
         
-        print("="*50)
-        print("RECEIVED DATA:", data)
-        print("="*50)
-        
-        # Validation
-        if not data.get('client_name'):
-            return jsonify({'error': 'Client name is required'}), 400
-        
-        if not data.get('items') or len(data['items']) == 0:
-            return jsonify({'error': 'At least one item is required'}), 400
-        
-        # Parse dates safely
         try:
-            if data.get('invoice_date'):
-                invoice_date_str = data['invoice_date'].split('T')[0]
-                invoice_date = datetime.strptime(invoice_date_str, '%Y-%m-%d').date()
-                print(f"Parsed invoice_date: {invoice_date}")
-            else:
-                invoice_date = datetime.utcnow().date()
-                print(f"Using default invoice_date: {invoice_date}")
-            
-            if data.get('due_date'):
-                due_date_str = data['due_date'].split('T')[0]
-                due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
-                print(f"Parsed due_date: {due_date}")
-            else:
-                due_date = None
-                print("No due_date provided")
+            values, item_rows, subtotal = parse_invoice_data(data)
         except ValueError as e:
-            print(f"DATE PARSING ERROR: {str(e)}")
-            return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
-        except Exception as e:
-            print(f"UNEXPECTED DATE ERROR: {str(e)}")
-            return jsonify({'error': f'Date error: {str(e)}'}), 400
+            return jsonify({'error': str(e)}), 400
         
         # Create invoice
-        print("Creating invoice object...")
-        invoice = Invoice(
-            invoice_number=generate_invoice_number(),
-            user_id=user_id,
-            client_name=data['client_name'],
-            client_email=data.get('client_email', ''),
-            client_address=data.get('client_address', ''),
-            invoice_date=invoice_date,
-            due_date=due_date,
-            notes=data.get('notes', ''),
-            tax_rate=float(data.get('tax_rate', 0.0)),
-            status=data.get('status', 'draft')
-        )
+        invoice = Invoice(invoice_number=generate_invoice_number(user_id), user_id=user_id, **values)
+        invoice.set_totals(subtotal)
         
         db.session.add(invoice)
         db.session.flush()
-        print(f"Invoice created with ID: {invoice.id}")
-        
-        # Add items
-        print(f"Adding {len(data['items'])} items...")
-        for idx, item_data in enumerate(data['items']):
-            print(f"Item {idx}: {item_data}")
-            item = InvoiceItem(
-                invoice_id=invoice.id,
-                description=item_data['description'],
-                quantity=int(item_data['quantity']),
-                unit_price=float(item_data['unit_price'])
-            )
-            item.calculate_total()
-            db.session.add(item)
-            print(f"Item {idx} added: {item.description} - ${item.total}")
         
-        db.session.flush()
-        invoice.calculate_totals()
-        print(f"Invoice totals calculated: Subtotal=${invoice.subtotal}, Total=${invoice.total}")
+        # Add items; the invoice's collection is filled from RETURNING instead of a reload
+        set_committed_value(invoice, 'items', insert_items(invoice.id, item_rows, returning=True))
+        InvoiceRollup.add_invoice(invoice)
+        index_invoice(invoice.id)
         
         db.session.commit()
-        print("Invoice committed successfully!")
         
         return jsonify({
             'message': 'Invoice created successfully',
@@ -385,13 +670,7 @@ def create_invoice():
         
     except Exception as e:
         db.session.rollback()
-        print("="*50)
-        print(f"ERROR CREATING INVOICE: {str(e)}")
-        print(f"ERROR TYPE: {type(e).__name__}")
-        import traceback
-        print("FULL TRACEBACK:")
-        traceback.print_exc()
-        print("="*50)
+        current_app.logger.exception('Error creating invoice')
         return jsonify({'error': str(e)}), 500
 
 
@@ -407,6 +686,8 @@ def update_invoice(invoice_id):
             return jsonify({'error': 'Invoice not found'}), 404
         
         data = request.get_json()
+        old_bucket = (invoice.invoice_date, invoice.status, invoice.total)
+        old_searchable = (invoice.client_name, invoice.client_email, invoice.notes)
         
         invoice.client_name = data.get('client_name', invoice.client_name)
         invoice.client_email = data.get('client_email', invoice.client_email)
@@ -427,20 +708,27 @@ def update_invoice(invoice_id):
             return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
         
         if 'items' in data:
-            InvoiceItem.query.filter_by(invoice_id=invoice.id).delete()
+            try:
+                item_rows, _ = parse_items(data['items'])
+                delta = sync_items(invoice, item_rows)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            for item_data in data['items']:
-                item = InvoiceItem(
-                    invoice_id=invoice.id,
-                    description=item_data['description'],
-                    quantity=int(item_data['quantity']),
-                    unit_price=float(item_data['unit_price'])
-                )
-                item.calculate_total()
-                db.session.add(item)
+            db.session.expire(invoice, ['items'])
+            invoice.set_totals((invoice.subtotal or 0.0) + delta)
+        else:
+            invoice.set_totals(invoice.subtotal or 0.0)
         
-        db.session.flush()
-        invoice.calculate_totals()
+        # Item-only edits do not dirty the invoice row, so bump it explicitly
+        invoice.updated_at = datetime.utcnow()
+        
+        if (invoice.invoice_date, invoice.status, invoice.total) != old_bucket:
+            old_date, old_status, old_total = old_bucket
+            InvoiceRollup.apply(invoice.user_id, old_date, old_status, -1, -(old_total or 0.0))
+            InvoiceRollup.add_invoice(invoice)
+        
+        if 'items' in data or (invoice.client_name, invoice.client_email, invoice.notes) != old_searchable:
+            index_invoice(invoice.id)
         
         db.session.commit()
         
@@ -451,7 +739,7 @@ def update_invoice(invoice_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error updating invoice: {str(e)}")
+        current_app.logger.exception('Error updating invoice')
         return jsonify({'error': str(e)}), 500
 
 
@@ -466,6 +754,9 @@ def delete_invoice(invoice_id):
         if not invoice:
             return jsonify({'error': 'Invoice not found'}), 404
         
+        db.session.execute(delete(InvoiceItem).where(InvoiceItem.invoice_id == invoice.id))
+        InvoiceRollup.add_invoice(invoice, sign=-1)
+        remove_invoice(invoice.id)
         db.session.delete(invoice)
         db.session.commit()
         
@@ -482,24 +773,214 @@ def download_pdf(invoice_id):
     """Download invoice as PDF"""
     try:
         user_id = get_jwt_identity()
-        invoice = Invoice.query.filter_by(id=invoice_id, user_id=user_id).first()
+        
+        if wants_async():
+            if not db.session.query(Invoice.id).filter_by(id=invoice_id, user_id=user_id).first():
+                return jsonify({'error': 'Invoice not found'}), 404
+            return job_accepted(enqueue_job(user_id, 'invoice_pdf', {'invoice_id': invoice_id}))
+        
+        # Invoice joined with its items; the owner comes from the user cache
+        invoice = Invoice.query.options(joinedload(Invoice.items)) \
+            .filter_by(id=invoice_id, user_id=user_id).first()
         
         if not invoice:
             return jsonify({'error': 'Invoice not found'}), 404
         
-        user = User.query.get(user_id)
+        user = load_current_user()
+        
+        render_options = pdf_render_options(user)
+        download_name = f"{invoice.invoice_number}.pdf"
+        
+        def render():
+            return pdf_renderer.render(invoice, user, render_options)
+        
+        if not pdf_cache.enabled:
+            return send_file(io.BytesIO(render()), mimetype='application/pdf',
+                            as_attachment=True, download_name=download_name)
+        
+        # The fingerprint doubles as a strong ETag
+        etag = invoice_fingerprint(invoice, user, **render_options)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        pdf_path = pdf_cache.get_or_render(etag, render)
+        response = send_file(pdf_path, mimetype='application/pdf', as_attachment=True,
+                             download_name=download_name, etag=etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+        
+    except PdfRenderBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/invoices/export/pdf', methods=['GET'])
+@jwt_required()
+def export_pdfs():
+    """Stream a ZIP of invoice PDFs filtered by ids, date range or status"""
+    try:
+        user_id = get_jwt_identity()
+        user = load_current_user()
+        
+        try:
+            query = filter_invoices(Invoice.query.filter_by(user_id=user_id), request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid filter: {str(e)}'}), 400
+        
+        if wants_async():
+            params = request.args.to_dict()
+            params.pop('async', None)
+            return job_accepted(enqueue_job(user_id, 'export_zip', params))
+        
+        query = query.options(selectinload(Invoice.items)).order_by(Invoice.id)
+        
+        workers = current_app.config.get('PDF_RENDER_WORKERS') or os.cpu_count()
+        pool = get_render_pool(workers)
+        chunks = stream_pdf_zip(query.yield_per(100), user, pdf_render_options(user),
+                                pool, window=workers * 2, cache=pdf_cache)
+        
+        download_name = f"invoices-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+        return current_app.response_class(
+            stream_with_context(chunks),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==================== IMPORT / EXPORT ====================
+
+@bp.route('/invoices/export', methods=['GET'])
+@jwt_required()
+def export_invoices():
+    """Stream all matching invoices with their items as CSV or JSONL"""
+    try:
+        user_id = get_jwt_identity()
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        try:
+            stmt = filter_invoices(export_query().where(Invoice.user_id == user_id), request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid filter: {str(e)}'}), 400
+        
+        download_name = f"invoices-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+        return current_app.response_class(
+            stream_with_context(stream_export(stmt, fmt)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/invoices/import', methods=['POST'])
+@jwt_required()
+def import_invoices():
+    """Bulk-import invoices from CSV or JSONL (multipart 'file' field or raw request body)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        upload = request.files.get('file')
+        if upload:
+            stream, source, content_type = upload.stream, upload.filename, upload.mimetype
+        else:
+            stream, source, content_type = request.stream, None, request.mimetype
+        fmt = request.args.get('format') or detect_format(source, content_type)
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+        
+        run = InvoiceImport(user_id=user_id, source=source, format=fmt)
+        db.session.add(run)
+        db.session.commit()
+        
+        if wants_async():
+            job_dir = current_app.config['RENDER_JOB_DIR']
+            os.makedirs(job_dir, exist_ok=True)
+            path = os.path.join(job_dir, f"{run.id}.{fmt}")
+            with open(path, 'wb') as fh:
+                shutil.copyfileobj(stream, fh)
+            job = enqueue_job(user_id, 'invoice_import', {'import_id': run.id, 'path': path})
+            return job_accepted(job, 'Import queued', import_id=run.id)
+        
+        run_import(run, stream)
+        return jsonify({
+            'message': 'Import finished',
+            'import': run.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Error importing invoices')
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/imports/<import_id>', methods=['GET'])
+@jwt_required()
+def get_import(import_id):
+    """Progress of a bulk import (counters are updated after every batch)"""
+    try:
+        user_id = get_jwt_identity()
+        run = InvoiceImport.query.filter_by(id=import_id, user_id=user_id).first()
+        
+        if not run:
+            return jsonify({'error': 'Import not found'}), 404
+        
+        return jsonify({'import': run.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==================== RENDER JOBS ====================
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get status of a background render job"""
+    try:
+        user_id = get_jwt_identity()
+        job = RenderJob.query.filter_by(id=job_id, user_id=user_id).first()
+        
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        data = job.to_dict()
+        if job.status == 'done':
+            data['artifact_url'] = f"/api/jobs/{job.id}/artifact"
+        return jsonify({'job': data}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/jobs/<job_id>/artifact', methods=['GET'])
+@jwt_required()
+def download_job_artifact(job_id):
+    """Download the file produced by a finished render job"""
+    try:
+        user_id = get_jwt_identity()
+        job = RenderJob.query.filter_by(id=job_id, user_id=user_id).first()
+        
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
         
-        logo_path = None
-        if getattr(user, 'company_logo', None):
-            # convert relative path to absolute server path
-            logo_path = os.path.join(os.getcwd(), user.company_logo)
+        if job.status != 'done':
+            return jsonify({'error': f'Job is {job.status}', 'job': job.to_dict()}), 409
         
-        pdf_bytes = generate_invoice_pdf(invoice, user, logo_path=logo_path,
-                                        theme_color="#0ea5a4",
-                                        currency_symbol="$")
+        if not job.artifact_path or not os.path.exists(job.artifact_path):
+            return jsonify({'error': 'Artifact expired'}), 410
         
-        return send_file(io.BytesIO(pdf_bytes), mimetype='application/pdf',
-                        as_attachment=True, download_name=f"{invoice.invoice_number}.pdf")
+        mimetype = 'application/zip' if job.kind == 'export_zip' else 'application/pdf'
+        return send_file(job.artifact_path, mimetype=mimetype, as_attachment=True,
+                        download_name=job.download_name)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
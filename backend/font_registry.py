@@ -0,0 +1,131 @@
+"""
+Process-wide registry of TrueType fonts for invoice PDFs.
+
+Each TTF file is parsed once per process and registered with ReportLab
+under a name derived from its path, size and modification time: the same
+in every worker, different for every file (and for a replaced file), so
+two fonts never overwrite each other. A regular face and an optional bold
+face are registered as one family, so <b> markup picks the bold file.
+
+How long each font took to load and how large the subsets embedded in
+PDFs are is recorded in metrics (pdf_font_load_seconds,
+pdf_font_subset_bytes) and in stats().
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FACES = ('Helvetica', 'Helvetica-Bold')
+
+
+class FontRegistry:
+    """
+    Loads TTF files on first use (or at startup for the configured ones)
+    and hands out their registered names.
+
+        regular, bold = font_registry.faces(font_path, bold_font_path)
+    """
+
+    def __init__(self, app=None):
+        self.preload_paths = ()
+        self._lock = threading.Lock()
+        self._names = {}  # (realpath, size, mtime_ns) -> font name, or None if it failed to load
+        self._families = set()
+        self._fonts = {}  # font name -> stats
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        paths = [app.config.get('PDF_FONT_PATH'), app.config.get('PDF_FONT_BOLD_PATH')]
+        paths += (app.config.get('PDF_PRELOAD_FONTS') or '').split(',')
+        self.preload_paths = tuple(path.strip() for path in paths if path and path.strip())
+        self.preload(self.preload_paths)
+        app.extensions['font_registry'] = self
+
+    def preload(self, paths):
+        """Load fonts ahead of the first render (app startup, render pool processes)"""
+        for path in paths:
+            if self.register(path) is None:
+                logger.warning('Font %s could not be loaded; PDFs fall back to Helvetica', path)
+
+    def register(self, path):
+        """The registered name of the TTF at path, loading it on first use; None if unusable"""
+        if not path or not os.path.isfile(path):
+            return None
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        key = (real, st.st_size, st.st_mtime_ns)
+        try:
+            return self._names[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._names:
+                self._names[key] = self._load(*key)
+            return self._names[key]
+
+    def faces(self, font_path=None, bold_font_path=None):
+        """(regular, bold) font names for a render; Helvetica unless font_path loads"""
+        regular = self.register(font_path)
+        if regular is None:
+            return DEFAULT_FACES
+        bold = self.register(bold_font_path) or regular
+        if (regular, bold) not in self._families:
+            with self._lock:
+                pdfmetrics.registerFontFamily(regular, normal=regular, bold=bold, italic=regular, boldItalic=bold)
+                self._families.add((regular, bold))
+        return regular, bold
+
+    def _load(self, path, size, mtime_ns):
+        stem = re.sub(r'[^A-Za-z0-9]+', '', os.path.splitext(os.path.basename(path))[0]) or 'Font'
+        name = f"{stem}-{hashlib.sha1(f'{path}:{size}:{mtime_ns}'.encode()).hexdigest()[:10]}"
+        start = time.perf_counter()
+        try:
+            font = TTFont(name, path)
+        except Exception:
+            logger.exception('Font load error: %s', path)
+            return None
+        seconds = time.perf_counter() - start
+        self._measure_subsets(font, name)
+        pdfmetrics.registerFont(font)
+        metrics.observe('pdf_font_load_seconds', seconds, font=name)
+        self._fonts[name] = {'path': path, 'bytes': size, 'load_seconds': round(seconds, 4),
+                             'subsets_embedded': 0, 'subset_bytes': 0}
+        logger.info('Loaded font %s as %s in %.1f ms', path, name, seconds * 1000)
+        return name
+
+    def _measure_subsets(self, font, name):
+        # ReportLab builds every subset it embeds through face.makeSubset
+        make_subset = font.face.makeSubset
+
+        def measured(subset):
+            data = make_subset(subset)
+            metrics.observe('pdf_font_subset_bytes', len(data), font=name)
+            with self._lock:
+                stats = self._fonts[name]
+                stats['subsets_embedded'] += 1
+                stats['subset_bytes'] += len(data)
+            return data
+
+        font.face.makeSubset = measured
+
+    def stats(self):
+        with self._lock:
+            fonts = {name: dict(stats) for name, stats in self._fonts.items()}
+        for stats in fonts.values():
+            embedded = stats['subsets_embedded']
+            stats['mean_subset_bytes'] = round(stats['subset_bytes'] / embedded) if embedded else None
+        return {'preloaded': list(self.preload_paths), 'fonts': fonts}
+
+
+font_registry = FontRegistry()
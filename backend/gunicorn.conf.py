@@ -0,0 +1,34 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory.
+
+    gunicorn 'app:app' --bind 0.0.0.0:$PORT
+
+GUNICORN_THREADS > 1 switches to the threaded (gthread) worker. Pair it
+with PDF_RENDER_MODE=process so PDF downloads wait on the render pool
+instead of holding a worker (and the GIL) for the whole ReportLab build.
+
+Workers report metrics through METRICS_DIR (default cache/metrics), which
+is emptied when the server starts so counters restart from zero. A worker
+writes its file every METRICS_FLUSH_INTERVAL seconds and once more when it
+exits, so requests served by recycled workers still count.
+"""
+import os
+
+from metrics import clear_metrics_dir, metrics
+
+workers = int(os.getenv('GUNICORN_WORKERS', os.getenv('WEB_CONCURRENCY', 3)))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+metrics_dir = os.environ.setdefault('METRICS_DIR', os.path.join(os.getcwd(), 'cache', 'metrics'))
+
+
+def on_starting(server):
+    os.makedirs(metrics_dir, exist_ok=True)
+    clear_metrics_dir(metrics_dir)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker process: write what it counted since its last flush
+    metrics.flush()
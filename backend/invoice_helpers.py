@@ -0,0 +1,131 @@
+"""
+Invoice helpers shared by the API routes and the background jobs.
+
+Payload parsing and validation (create_invoice, bulk import), query-string
+filters, the query a PDF render loads, and the options every PDF endpoint
+renders with.
+"""
+import os
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Invoice
+
+
+def invoice_with_owner_query():
+    """Invoice query that loads what a PDF render touches: owner joined, items selectin-loaded"""
+    return Invoice.query.options(joinedload(Invoice.user), selectinload(Invoice.items))
+
+
+def pdf_render_options(user):
+    """Keyword arguments for generate_invoice_pdf shared by all PDF endpoints"""
+    logo_path = None
+    if getattr(user, 'company_logo', None):
+        # convert relative path to absolute server path
+        logo_path = os.path.join(os.getcwd(), user.company_logo)
+    return dict(logo_path=logo_path, theme_color="#0ea5a4", currency_symbol="$",
+                engine=current_app.config['PDF_ENGINE'],
+                font_path=current_app.config.get('PDF_FONT_PATH'),
+                bold_font_path=current_app.config.get('PDF_FONT_BOLD_PATH'))
+
+
+def parse_date_param(value):
+    """Parse 'YYYY-MM-DD' (or an ISO datetime) into a date; raises ValueError"""
+    return datetime.strptime(value.split('T')[0], '%Y-%m-%d').date()
+
+
+def parse_items(items_data):
+    """
+    Validate line items and compute their totals in one pass.
+    
+    Returns (rows, subtotal) where rows are plain dicts ready for insert_items.
+    Raises ValueError naming the first bad item.
+    """
+    rows = []
+    subtotal = 0.0
+    for idx, item_data in enumerate(items_data):
+        try:
+            description = item_data['description']
+            quantity = int(item_data['quantity'])
+            unit_price = float(item_data['unit_price'])
+            item_id = int(item_data['id']) if item_data.get('id') is not None else None
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Invalid item {idx + 1}: {str(e)}')
+        if not description:
+            raise ValueError(f'Invalid item {idx + 1}: description is required')
+        
+        total = quantity * unit_price
+        subtotal += total
+        row = {
+            'description': description,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total': total
+        }
+        if item_id is not None:
+            row['id'] = item_id
+        rows.append(row)
+    return rows, subtotal
+
+
+def parse_invoice_data(data):
+    """
+    Validate a new invoice payload (create_invoice, bulk import).
+    
+    Returns (values, item_rows, subtotal): Invoice column values without the
+    number and totals, plus the parsed items. Raises ValueError.
+    """
+    if not data.get('client_name'):
+        raise ValueError('Client name is required')
+    
+    if not data.get('items') or len(data['items']) == 0:
+        raise ValueError('At least one item is required')
+    
+    item_rows, subtotal = parse_items(data['items'])
+    
+    # Parse dates safely
+    try:
+        if data.get('invoice_date'):
+            invoice_date = parse_date_param(data['invoice_date'])
+        else:
+            invoice_date = datetime.utcnow().date()
+        
+        if data.get('due_date'):
+            due_date = parse_date_param(data['due_date'])
+        else:
+            due_date = None
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid date format: {str(e)}')
+    
+    try:
+        tax_rate = float(data.get('tax_rate') or 0.0)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid tax rate')
+    
+    values = {
+        'client_name': data['client_name'],
+        'client_email': data.get('client_email', ''),
+        'client_address': data.get('client_address', ''),
+        'invoice_date': invoice_date,
+        'due_date': due_date,
+        'notes': data.get('notes', ''),
+        'tax_rate': tax_rate,
+        'status': data.get('status') or 'draft'
+    }
+    return values, item_rows, subtotal
+
+
+def filter_invoices(query, args):
+    """Apply ids / date_from / date_to / status filters from query-string args"""
+    if args.get('ids'):
+        ids = [int(i) for i in args['ids'].split(',') if i.strip()]
+        query = query.filter(Invoice.id.in_(ids))
+    if args.get('date_from'):
+        query = query.filter(Invoice.invoice_date >= parse_date_param(args['date_from']))
+    if args.get('date_to'):
+        query = query.filter(Invoice.invoice_date <= parse_date_param(args['date_to']))
+    if args.get('status'):
+        query = query.filter(Invoice.status.in_(args['status'].split(',')))
+    return query
@@ -0,0 +1,194 @@
+"""
+Streaming bulk import of invoices from CSV or JSONL.
+
+The input is parsed record by record and written in batches: each batch
+reserves a block of invoice numbers, inserts invoices and items with
+executemany, updates rollups and search documents, and commits together
+with the import's progress counters. Memory stays bounded by the batch size
+whatever the file size.
+
+JSONL: one invoice per line, in the same shape as the POST /api/invoices body.
+
+CSV: one line item per row. Consecutive rows sharing an ``invoice_ref`` form
+one invoice whose fields are taken from its first row; rows without a
+reference are single-item invoices. Columns: invoice_ref, client_name,
+client_email, client_address, invoice_date, due_date, notes, tax_rate,
+status, description, quantity, unit_price.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from invoice_helpers import parse_invoice_data
+from models import db, Invoice, InvoiceItem, InvoiceImport, InvoiceRollup, InvoiceSequence
+from search_index import index_invoices
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+IMPORT_BATCH_SIZE = 500
+
+CSV_INVOICE_COLUMNS = (
+    'client_name', 'client_email', 'client_address', 'invoice_date', 'due_date',
+    'notes', 'tax_rate', 'status',
+)
+CSV_ITEM_COLUMNS = ('description', 'quantity', 'unit_price')
+
+
+def detect_format(filename, content_type=None):
+    """Guess the import format from a file name or content type (None if unknown)"""
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return None
+
+
+def _read_jsonl(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {str(e)}'
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, 'Expected a JSON object'
+            continue
+        yield line_number, data, None
+
+
+def _read_csv(lines):
+    reader = csv.DictReader(lines)
+    current, current_ref, start = None, None, None
+    for row in reader:
+        ref = (row.get('invoice_ref') or '').strip()
+        item = {name: row.get(name) for name in CSV_ITEM_COLUMNS}
+        if current is not None and ref and ref == current_ref:
+            current['items'].append(item)
+            continue
+
+        if current is not None:
+            yield start, current, None
+        current = {name: row.get(name) for name in CSV_INVOICE_COLUMNS}
+        current['items'] = [item]
+        # Header is line 1, so data rows are numbered like a spreadsheet
+        current_ref, start = ref, reader.line_num
+    if current is not None:
+        yield start, current, None
+
+
+READERS = {
+    'csv': _read_csv,
+    'jsonl': _read_jsonl,
+}
+
+
+def read_records(stream, fmt):
+    """Yield (row_number, invoice_data, error) from a binary stream, one invoice at a time"""
+    lines = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return READERS[fmt](lines)
+
+
+def _write_batch(user_id, batch):
+    """Insert a batch of validated (values, item_rows, subtotal) invoices"""
+    numbers = InvoiceSequence.allocate(user_id, count=len(batch))
+    now = datetime.utcnow()
+    invoice_rows = []
+    for number, (values, _, subtotal) in zip(numbers, batch):
+        invoice_rows.append(dict(
+            values,
+            **Invoice.compute_totals(subtotal, values['tax_rate']),
+            invoice_number=f'INV-{number:05d}',
+            user_id=user_id,
+            created_at=now,
+            updated_at=now
+        ))
+
+    # Numbers are unique per user, so they map RETURNING rows back to the batch
+    ids = {
+        row.invoice_number: row.id for row in db.session.execute(
+            insert(Invoice).returning(Invoice.id, Invoice.invoice_number), invoice_rows
+        )
+    }
+
+    item_rows = []
+    buckets = defaultdict(lambda: [0, 0.0])
+    for invoice_row, (_, rows, _) in zip(invoice_rows, batch):
+        invoice_id = ids[invoice_row['invoice_number']]
+        for row in rows:
+            row.pop('id', None)
+            row['invoice_id'] = invoice_id
+            item_rows.append(row)
+        bucket = buckets[(invoice_row['invoice_date'].replace(day=1), invoice_row['status'])]
+        bucket[0] += 1
+        bucket[1] += invoice_row['total']
+    db.session.execute(insert(InvoiceItem), item_rows)
+
+    for (month, status), (count, amount) in buckets.items():
+        InvoiceRollup.apply(user_id, month, status, count, amount)
+    index_invoices(ids.values())
+
+
+def run_import(run, stream, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Import every record of stream for run.user_id, recording progress on run.
+
+    Invalid records are counted and reported in run.errors; valid ones are
+    committed batch by batch together with the counters, so an interrupted
+    import keeps what it wrote. Running it again on the same input resumes
+    after the last committed record. progress(run) is called after each commit.
+    """
+    def flush(batch):
+        if batch:
+            _write_batch(run.user_id, batch)
+            run.imported_count += len(batch)
+        db.session.commit()
+        if progress is not None:
+            progress(run)
+
+    skip = run.records_read
+    errors = list(run.errors or [])
+    run.status = 'running'
+    db.session.commit()
+
+    batch = []
+    try:
+        for record_number, (row_number, data, error) in enumerate(read_records(stream, run.format)):
+            if record_number < skip:
+                continue
+            run.records_read += 1
+            if error is None:
+                try:
+                    batch.append(parse_invoice_data(data))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                run.failed_count += 1
+                if len(errors) < InvoiceImport.MAX_ERRORS:
+                    errors.append({'row': row_number, 'error': error})
+                    # Reassign so the JSON column is marked dirty
+                    run.errors = list(errors)
+
+            # Counting records, not just valid invoices, keeps progress moving on bad input
+            if (run.records_read - skip) % batch_size == 0:
+                flush(batch)
+                batch = []
+        if (run.records_read - skip) % batch_size:
+            flush(batch)
+        run.status = 'done'
+    except Exception as e:
+        # Counters roll back to the last committed batch, ready for a resume
+        db.session.rollback()
+        run.status = 'failed'
+        run.error = str(e)
+        raise
+    finally:
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+    return run
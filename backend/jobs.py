@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.orm import selectinload
+
+from bulk_export import get_render_pool, stream_pdf_zip
+from invoice_helpers import filter_invoices, invoice_with_owner_query, pdf_render_options
+from invoice_import import run_import
+from metrics import metrics
+from models import db, User, Invoice, InvoiceImport, RenderJob
+from pdf_cache import pdf_cache, invoice_fingerprint
+from pdf_generator import generate_invoice_pdf
+
+
+def enqueue_job(user_id, kind, params):
+    """Queue a render job and commit it so a worker can pick it up"""
+    job = RenderJob(user_id=user_id, kind=kind, params=params)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running'.
+
+    The conditional UPDATE is the lock: if another worker claimed the job
+    first, rowcount is 0 and we try the next one. Works on SQLite and
+    PostgreSQL without SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    while True:
+        job_id = db.session.query(RenderJob.id).filter_by(status='queued') \
+            .order_by(RenderJob.created_at).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        
+        result = db.session.execute(
+            update(RenderJob)
+            .where(RenderJob.id == job_id, RenderJob.status == 'queued')
+            .values(status='running', started_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(RenderJob, job_id, populate_existing=True)
+
+
+def requeue_stale_jobs(timeout):
+    """Put back jobs left 'running' by a worker that died"""
+    cutoff = datetime.utcnow() - timeout
+    db.session.execute(
+        update(RenderJob)
+        .where(RenderJob.status == 'running', RenderJob.started_at < cutoff)
+        .values(status='queued', started_at=None)
+    )
+    db.session.commit()
+
+
+def purge_expired_jobs(retention):
+    """Delete finished jobs (and their artifacts) older than retention"""
+    cutoff = datetime.utcnow() - retention
+    expired = RenderJob.query.filter(
+        RenderJob.status.in_(['done', 'failed']),
+        RenderJob.finished_at < cutoff
+    ).all()
+    for job in expired:
+        if job.artifact_path and os.path.exists(job.artifact_path):
+            os.remove(job.artifact_path)
+        db.session.delete(job)
+    db.session.commit()
+
+
+def _render_invoice_pdf(job, artifact_path):
+    invoice = invoice_with_owner_query() \
+        .filter_by(id=job.params['invoice_id'], user_id=job.user_id).first()
+    if not invoice:
+        raise LookupError('Invoice not found')
+    user = invoice.user
+    
+    options = pdf_render_options(user)
+    render = lambda: generate_invoice_pdf(invoice, user, **options)
+    if pdf_cache.enabled:
+        key = invoice_fingerprint(invoice, user, **options)
+        shutil.copyfile(pdf_cache.get_or_render(key, render), artifact_path)
+    else:
+        with open(artifact_path, 'wb') as fh:
+            fh.write(render())
+    return f"{invoice.invoice_number}.pdf"
+
+
+def _render_export_zip(job, artifact_path):
+    user = db.session.get(User, job.user_id)
+    query = filter_invoices(Invoice.query.filter_by(user_id=job.user_id), job.params)
+    query = query.options(selectinload(Invoice.items)).order_by(Invoice.id)
+    
+    workers = current_app.config.get('PDF_RENDER_WORKERS') or os.cpu_count()
+    chunks = stream_pdf_zip(query.yield_per(100), user, pdf_render_options(user),
+                            get_render_pool(workers), window=workers * 2, cache=pdf_cache)
+    with open(artifact_path, 'wb') as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+    return f"invoices-{job.created_at:%Y%m%d-%H%M%S}.zip"
+
+
+def _import_invoices(job, artifact_path):
+    run = db.session.get(InvoiceImport, job.params['import_id'])
+    # A requeued job resumes after the last committed batch; the upload is
+    # only removed once the import has finished
+    with open(job.params['path'], 'rb') as fh:
+        run_import(run, fh)
+    os.remove(job.params['path'])
+    
+    with open(artifact_path, 'w') as fh:
+        json.dump(run.to_dict(), fh)
+    return f"import-{run.id}.json"
+
+
+JOB_RUNNERS = {
+    'invoice_pdf': ('.pdf', _render_invoice_pdf),
+    'export_zip': ('.zip', _render_export_zip),
+    'invoice_import': ('.json', _import_invoices),
+}
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome"""
+    suffix, runner = JOB_RUNNERS[job.kind]
+    job_dir = current_app.config['RENDER_JOB_DIR']
+    os.makedirs(job_dir, exist_ok=True)
+    artifact_path = os.path.join(job_dir, f"{job.id}{suffix}")
+    
+    try:
+        job.download_name = runner(job, artifact_path)
+        job.artifact_path = artifact_path
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Render job %s failed', job.id)
+        job.status = 'failed'
+        job.error = str(e)
+        if os.path.exists(artifact_path):
+            os.remove(artifact_path)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_worker(poll_interval=1.0, once=False):
+    """Process queued jobs until interrupted (or until the queue is empty with once=True)"""
+    config = current_app.config
+    timeout = timedelta(seconds=config['RENDER_JOB_TIMEOUT'])
+    retention = timedelta(hours=config['RENDER_JOB_RETENTION_HOURS'])
+    purge_interval = config['RENDER_JOB_PURGE_INTERVAL']
+    requeue_stale_jobs(timeout)
+    
+    next_purge = 0.0
+    try:
+        while True:
+            # On a timer, so a worker that never sees an empty queue still purges
+            if time.monotonic() >= next_purge:
+                purge_expired_jobs(retention)
+                next_purge = time.monotonic() + purge_interval
+            
+            job = claim_next_job()
+            if job is not None:
+                run_job(job)
+                metrics.maybe_flush()
+                continue
+            
+            metrics.flush()
+            if once:
+                return
+            time.sleep(poll_interval)
+    finally:
+        # Stopped (Ctrl-C, SIGTERM): report the jobs run since the last flush
+        metrics.flush()
@@ -0,0 +1,71 @@
+"""
+JSON providers for the app: orjson when installed, the stdlib otherwise.
+
+Both write dates and datetimes as ISO 8601 (Flask's default is an HTTP
+date), so models can hand raw values to jsonify and the output does not
+depend on which provider is active.
+"""
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider with ISO 8601 dates"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):  # datetime included
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(IsoJSONProvider):
+    """
+    Serializes with orjson, which encodes dates, datetimes and floats in C.
+
+    Keys are not sorted. Calls that pass stdlib-only options (indent,
+    sort_keys, ...) are handed to the stdlib provider.
+    """
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': IsoJSONProvider,
+}
+
+
+def init_json(app):
+    """Install the provider named by JSON_SERIALIZER (auto, orjson or stdlib)"""
+    name = app.config.get('JSON_SERIALIZER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_SERIALIZER=orjson but the orjson package is not installed')
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,37 @@
+import hashlib
+from io import BytesIO
+from PIL import Image, ImageOps
+
+# Logos are drawn 2.5 cm high on the invoice; 300 px is ~300 dpi at that size
+LOGO_MAX_HEIGHT_PX = 300
+LOGO_MAX_WIDTH_PX = 1200
+LOGO_JPEG_QUALITY = 90
+
+
+def normalize_logo(stream):
+    """
+    Convert an uploaded logo into a print-sized JPEG.
+
+    Transparency is flattened onto white (the invoice background) so the
+    result can be embedded by ReportLab as a JPEG passthrough instead of
+    being re-compressed on every render.
+
+    Returns (jpeg_bytes, sha256_hex). Raises on unreadable images.
+    """
+    with Image.open(stream) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[3])
+            img = background
+        else:
+            img = img.convert('RGB')
+
+        img.thumbnail((LOGO_MAX_WIDTH_PX, LOGO_MAX_HEIGHT_PX), Image.LANCZOS)
+
+        out = BytesIO()
+        img.save(out, format='JPEG', quality=LOGO_JPEG_QUALITY, optimize=True)
+
+    data = out.getvalue()
+    return data, hashlib.sha256(data).hexdigest()
@@ -0,0 +1,252 @@
+"""
+Prometheus metrics without a client library dependency.
+
+Each process (gunicorn worker, render pool process, render worker) keeps
+its own counters and histograms and periodically writes them to a file of
+its own in METRICS_DIR. /api/metrics merges every file, so a scrape sees
+totals across all processes. Files of exited processes are kept, so
+counters never go backwards, and are cleared when gunicorn starts
+(see gunicorn.conf.py).
+"""
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+PHASE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BYTES_BUCKETS = (4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route and status code', None),
+    'http_request_duration_seconds': ('histogram', 'Time to produce a response, by route', LATENCY_BUCKETS),
+    'http_request_sql_statements': ('histogram', 'SQL statements executed per request', SQL_COUNT_BUCKETS),
+    'http_request_sql_duration_seconds': ('histogram', 'Time spent in SQL per request', LATENCY_BUCKETS),
+    'pdf_render_phase_seconds': ('histogram', 'generate_invoice_pdf time per phase', PHASE_BUCKETS),
+    'pdf_font_load_seconds': ('histogram', 'Time to parse and register a TTF font', PHASE_BUCKETS),
+    'pdf_font_subset_bytes': ('histogram', 'Size of each font subset embedded in a PDF', BYTES_BUCKETS),
+}
+
+
+class Stopwatch:
+    """
+    Splits a run into named phases and observes each phase's total once.
+
+        clock = metrics.stopwatch('pdf_render_phase_seconds')
+        ...; clock.lap('styles')
+        ...; clock.lap('build')
+        clock.done()
+    """
+
+    def __init__(self, registry, name, label):
+        self._registry = registry
+        self._name = name
+        self._label = label
+        self._last = time.perf_counter()
+        self.phases = {}
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase (repeated laps add up)"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def done(self):
+        for phase, seconds in self.phases.items():
+            self._registry.observe(self._name, seconds, **{self._label: phase})
+
+
+class Metrics:
+    """
+    In-process metric registry plus the Flask hooks that feed it.
+
+    Per request: latency and status by route (the URL rule, so
+    /invoices/<int:invoice_id> is one series), and the SQL statement count
+    and time collected by query_counter. Streamed responses are timed up
+    to the first byte.
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.flush_interval = 5.0
+        self._lock = threading.Lock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._file = None
+        self._counters = {}
+        self._histograms = {}
+        self._dirty = False
+        self._flushed_at = 0.0
+
+    def init_app(self, app):
+        self.configure(app.config.get('METRICS_DIR'), app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+        app.extensions['metrics'] = self
+
+        @app.before_request
+        def start_request_timer():
+            from flask import g
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            from flask import g, request
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else '<unmatched>'
+                self.inc('http_requests_total', method=request.method, route=route,
+                         status=str(response.status_code))
+                self.observe('http_request_duration_seconds', time.perf_counter() - started,
+                             method=request.method, route=route)
+                self.observe('http_request_sql_statements', g.get('sql_query_count', 0),
+                             method=request.method, route=route)
+                self.observe('http_request_sql_duration_seconds', g.get('sql_query_seconds', 0.0),
+                             method=request.method, route=route)
+                self.maybe_flush()
+            return response
+
+    def configure(self, directory, flush_interval=5.0):
+        """Set where this process writes its metrics (None keeps them in memory only)"""
+        self.directory = directory
+        self.flush_interval = float(flush_interval)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _check_pid(self):
+        # A forked child must not report (or overwrite) its parent's numbers
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_pid()
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = METRICS[name][2]
+        with self._lock:
+            self._check_pid()
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[0][i] += 1
+                    break
+            hist[1] += value
+            hist[2] += 1
+            self._dirty = True
+
+    def stopwatch(self, name, label='phase'):
+        return Stopwatch(self, name, label)
+
+    def _snapshot(self):
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+            'histograms': [[name, dict(labels)] + hist for (name, labels), hist in self._histograms.items()],
+        }
+
+    def flush(self):
+        """Write this process's metrics to its file in METRICS_DIR"""
+        if not self.directory:
+            return
+        with self._lock:
+            self._check_pid()
+            if not self._dirty:
+                return
+            if self._file is None:
+                self._file = os.path.join(self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+            data = json.dumps(self._snapshot())
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+        tmp = f"{self._file}.tmp"
+        with open(tmp, 'w') as fh:
+            fh.write(data)
+        os.replace(tmp, self._file)
+
+    def maybe_flush(self):
+        if self.directory and self._dirty and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """Counters and histograms summed over every process that has reported"""
+        self.flush()
+        if self.directory:
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                try:
+                    with open(path) as fh:
+                        snapshots.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue  # removed or replaced mid-read
+        else:
+            with self._lock:
+                snapshots = [self._snapshot()]
+
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, histograms
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, bounds) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, hits in zip(bounds, buckets):
+                    cumulative += hits
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def clear_metrics_dir(directory):
+    """Drop files left by a previous server run (call before workers start)"""
+    for path in glob.glob(os.path.join(directory, '*.json*')):
+        os.remove(path)
+
+
+metrics = Metrics()
@@ -0,0 +1,65 @@
+"""invoice full text search
+
+Revision ID: 0e1e67a19bb9
+Revises: e9ba9d8732bf
+Create Date: 2026-10-18 07:07:04.348899
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0e1e67a19bb9'
+down_revision = 'e9ba9d8732bf'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE invoice_search USING fts5("
+    "owner, client_name, client_email, notes, items, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "INSERT INTO invoice_search (rowid, owner, client_name, client_email, notes, items) "
+    "SELECT i.id, 'u' || i.user_id, i.client_name, i.client_email, i.notes, "
+    "(SELECT group_concat(it.description, ' ') FROM invoice_items it WHERE it.invoice_id = i.id) "
+    "FROM invoices i",
+]
+
+
+def _pg_text(expr):
+    # op.execute() treats ":name" as a bind parameter, hence the escaped colons
+    return (f"to_tsvector('simple', regexp_replace(coalesce({expr}, ''), "
+            r"'[^[\:alnum\:]]+', ' ', 'g'))")
+
+
+POSTGRES_UPGRADE = [
+    "CREATE TABLE invoice_search ("
+    "invoice_id INTEGER PRIMARY KEY REFERENCES invoices (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL, "
+    "document TSVECTOR NOT NULL)",
+    "INSERT INTO invoice_search (invoice_id, user_id, document) "
+    "SELECT i.id, i.user_id, "
+    f"setweight({_pg_text('i.client_name')}, 'A') || "
+    f"setweight({_pg_text('i.client_email')}, 'A') || "
+    f"setweight({_pg_text('i.notes')}, 'B') || "
+    "setweight(" + _pg_text(
+        "(SELECT string_agg(it.description, ' ') FROM invoice_items it WHERE it.invoice_id = i.id)"
+    ) + ", 'C') "
+    "FROM invoices i",
+    # Built after the backfill: one bulk GIN build is much faster than row-by-row inserts
+    "CREATE INDEX ix_invoice_search_document ON invoice_search USING GIN (document)",
+    "CREATE INDEX ix_invoice_search_user_id ON invoice_search (user_id)",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        statements = POSTGRES_UPGRADE
+    else:
+        statements = SQLITE_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    op.execute("DROP TABLE invoice_search")
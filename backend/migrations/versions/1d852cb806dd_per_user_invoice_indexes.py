@@ -0,0 +1,40 @@
+"""per-user invoice indexes
+
+Revision ID: 1d852cb806dd
+Revises: 5a0d3c9e7b21
+Create Date: 2026-10-18 06:58:19.369499
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1d852cb806dd'
+down_revision = '5a0d3c9e7b21'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_invoice_items_invoice_id', 'invoice_items', ['invoice_id']),
+    ('ix_invoices_user_id_created_at', 'invoices', ['user_id', 'created_at', 'id']),
+    ('ix_invoices_user_id_due_date', 'invoices', ['user_id', 'due_date']),
+    ('ix_invoices_user_id_status', 'invoices', ['user_id', 'status']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build without blocking writes on large tables; CONCURRENTLY cannot run in a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        return
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""invoice updated_at index
+
+Revision ID: 83f744c17753
+Revises: 33ca47b966ac
+Create Date: 2026-10-18 07:19:05.772650
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '83f744c17753'
+down_revision = '33ca47b966ac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build without blocking writes on large tables; CONCURRENTLY cannot run in a transaction
+        with op.get_context().autocommit_block():
+            op.create_index('ix_invoices_user_id_updated_at', 'invoices', ['user_id', 'updated_at'],
+                            unique=False, postgresql_concurrently=True)
+        return
+
+    op.create_index('ix_invoices_user_id_updated_at', 'invoices', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_invoices_user_id_updated_at', table_name='invoices')
@@ -1,8 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy import func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from password_hashing import password_hasher
+from datetime import date, datetime
+import uuid
 
-db = SQLAlchemy()
+# Objects stay usable after commit: serializing a response must not re-SELECT what we just wrote
+db = SQLAlchemy(session_options={'expire_on_commit': False})
+
+
+def dialect_insert(model):
+    """INSERT construct supporting on_conflict_* for the bound database (SQLite or PostgreSQL)"""
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(model)
+
+
+def serialize_value(value):
+    """JSON-ready form of a column value: dates and datetimes as ISO 8601 strings"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -17,13 +34,23 @@ class User(db.Model):
     phone = db.Column(db.String(20))  # optional phone field
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Bumped on every profile edit; access tokens carry it so cached profiles can be checked
+    profile_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
     invoices = db.relationship('Invoice', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def upgrade_password_hash(self, password):
+        """After a successful check: re-hash if the stored hash uses old parameters"""
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
     
     def to_dict(self):
         return {
@@ -39,9 +66,19 @@ class User(db.Model):
 
 class Invoice(db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        # Every invoice query is scoped to one user; id breaks created_at ties for keyset paging
+        db.Index('ix_invoices_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_invoices_user_id_status', 'user_id', 'status'),
+        db.Index('ix_invoices_user_id_due_date', 'user_id', 'due_date'),
+        # Covers count + max(updated_at) for the list ETag
+        db.Index('ix_invoices_user_id_updated_at', 'user_id', 'updated_at'),
+        # Numbers come from a per-user sequence, so they are unique per user
+        db.UniqueConstraint('user_id', 'invoice_number', name='uq_invoices_user_id_invoice_number'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    invoice_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    invoice_number = db.Column(db.String(50), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Client details
@@ -66,30 +103,54 @@ class Invoice(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
+    # Loading strategy is chosen per query (joinedload / selectinload); deletes remove
+    # items with one bulk DELETE first, so the cascade never needs to load them.
+    items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan',
+                            passive_deletes=True)
+    
+    # Columns a client may request with ?fields= on the list endpoint
+    PROJECTABLE_FIELDS = (
+        'id', 'invoice_number', 'client_name', 'client_email', 'client_address',
+        'invoice_date', 'due_date', 'notes', 'subtotal', 'tax_rate', 'tax_amount',
+        'total', 'status', 'created_at', 'updated_at'
+    )
     
     def calculate_totals(self):
-        self.subtotal = sum(item.total for item in self.items)
-        self.tax_amount = self.subtotal * (self.tax_rate / 100)
-        self.total = self.subtotal + self.tax_amount
+        self.set_totals(sum(item.total for item in self.items))
+    
+    @staticmethod
+    def compute_totals(subtotal, tax_rate):
+        """Column values for subtotal, tax_amount and total"""
+        tax_amount = subtotal * ((tax_rate or 0.0) / 100)
+        return {'subtotal': subtotal, 'tax_amount': tax_amount, 'total': subtotal + tax_amount}
     
-    def to_dict(self, include_items=False):
+    def set_totals(self, subtotal):
+        """Derive tax and total from an already-known subtotal"""
+        for name, value in self.compute_totals(subtotal, self.tax_rate).items():
+            setattr(self, name, value)
+    
+    def to_dict(self, include_items=False, fields=None):
+        if fields is not None:
+            # Projection: only touch the requested (loaded) columns
+            return {name: getattr(self, name) for name in fields}
+        
         data = {
             'id': self.id,
             'invoice_number': self.invoice_number,
             'client_name': self.client_name,
             'client_email': self.client_email,
             'client_address': self.client_address,
-            'invoice_date': self.invoice_date.isoformat() if self.invoice_date else None,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
+            # Dates stay date objects: the app's JSON provider writes them as ISO 8601
+            'invoice_date': self.invoice_date,
+            'due_date': self.due_date,
             'notes': self.notes,
             'subtotal': self.subtotal,
             'tax_rate': self.tax_rate,
             'tax_amount': self.tax_amount,
             'total': self.total,
             'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
         
         if include_items:
@@ -98,11 +159,113 @@ class Invoice(db.Model):
         return data
 
 
+class InvoiceSequence(db.Model):
+    __tablename__ = 'invoice_sequences'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def allocate(cls, user_id, count=1):
+        """
+        Reserve `count` consecutive numbers for a user and return them.
+        
+        Runs in the caller's transaction: the UPDATE row-locks the user's
+        counter until commit, so concurrent creates never see the same value
+        and a rollback hands the numbers back.
+        """
+        db.session.execute(
+            dialect_insert(cls).values(user_id=user_id, last_value=0)
+            .on_conflict_do_nothing(index_elements=['user_id'])
+        )
+        last = db.session.execute(
+            update(cls)
+            .where(cls.user_id == user_id)
+            .values(last_value=cls.last_value + count)
+            .returning(cls.last_value)
+        ).scalar_one()
+        return list(range(last - count + 1, last + 1))
+
+
+def month_key(column):
+    """SQL expression for 'YYYY-MM' of a date column on the bound database"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+class InvoiceRollup(db.Model):
+    """Per-user invoice counts and amounts by month (of invoice_date) and status"""
+    __tablename__ = 'invoice_rollups'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    status = db.Column(db.String(20), primary_key=True)
+    
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    
+    @classmethod
+    def apply(cls, user_id, invoice_date, status, count, amount):
+        """Add a delta to one bucket, creating it if needed (runs in the caller's transaction)"""
+        stmt = dialect_insert(cls).values(
+            user_id=user_id,
+            month=invoice_date.strftime('%Y-%m'),
+            status=status or 'draft',
+            invoice_count=count,
+            total_amount=amount
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month', 'status'],
+            set_={
+                'invoice_count': cls.invoice_count + stmt.excluded.invoice_count,
+                'total_amount': cls.total_amount + stmt.excluded.total_amount
+            }
+        )
+        db.session.execute(stmt)
+    
+    @classmethod
+    def add_invoice(cls, invoice, sign=1):
+        """Count an invoice in (sign=1) or out of (sign=-1) its bucket"""
+        cls.apply(invoice.user_id, invoice.invoice_date, invoice.status, sign, sign * (invoice.total or 0.0))
+    
+    @classmethod
+    def rebuild(cls, user_id=None):
+        """Recompute buckets from the invoices table (for backfills and repairs)"""
+        delete_stmt = db.delete(cls)
+        source = db.select(
+            Invoice.user_id,
+            month_key(Invoice.invoice_date),
+            func.coalesce(Invoice.status, 'draft'),
+            func.count(),
+            func.coalesce(func.sum(Invoice.total), 0.0)
+        )
+        if user_id is not None:
+            delete_stmt = delete_stmt.where(cls.user_id == user_id)
+            source = source.where(Invoice.user_id == user_id)
+        source = source.group_by(
+            Invoice.user_id, month_key(Invoice.invoice_date), func.coalesce(Invoice.status, 'draft')
+        )
+        
+        db.session.execute(delete_stmt)
+        db.session.execute(db.insert(cls).from_select(
+            ['user_id', 'month', 'status', 'invoice_count', 'total_amount'], source
+        ))
+    
+    def to_dict(self):
+        return {
+            'month': self.month,
+            'status': self.status,
+            'count': self.invoice_count,
+            'total': self.total_amount
+        }
+
+
 class InvoiceItem(db.Model):
     __tablename__ = 'invoice_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False, index=True)
     
     description = db.Column(db.String(255), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
@@ -120,3 +283,75 @@ class InvoiceItem(db.Model):
             'unit_price': self.unit_price,
             'total': self.total
         }
+
+
+
+class RenderJob(db.Model):
+    __tablename__ = 'render_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    kind = db.Column(db.String(20), nullable=False)  # invoice_pdf, export_zip, invoice_import
+    params = db.Column(db.JSON, default=dict)
+    
+    # Status
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    artifact_path = db.Column(db.String(255))
+    download_name = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class InvoiceImport(db.Model):
+    """Progress and outcome of one bulk invoice import (updated after every batch)"""
+    __tablename__ = 'invoice_imports'
+    
+    # Only the first errors are kept; failed_count has the full number
+    MAX_ERRORS = 1000
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    source = db.Column(db.String(255))  # uploaded file name
+    format = db.Column(db.String(10), nullable=False)  # csv, jsonl
+    
+    # Status
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    records_read = db.Column(db.Integer, nullable=False, default=0)  # invoices, not CSV lines
+    imported_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, default=list)  # [{'row': n, 'error': message}]
+    error = db.Column(db.Text)  # why the whole import stopped, if it did
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'format': self.format,
+            'status': self.status,
+            'records_read': self.records_read,
+            'imported': self.imported_count,
+            'failed': self.failed_count,
+            'errors': self.errors or [],
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Too many hashes queued; the caller should answer 503 and let the client retry"""
+
+
+class PasswordHasher:
+    """
+    Runs the (deliberately slow) password hashes on a small thread pool.
+
+    hashlib releases the GIL while hashing, so capping the pool at a few
+    threads caps the CPU a burst of logins can take from other requests.
+    Callers still wait for their own hash; once more than `max_queue`
+    hashes are waiting, new ones are rejected with PasswordHashingBusy
+    instead of piling up.
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.workers = max(1, (os.cpu_count() or 2) // 2)
+        self.max_queue = 64
+        self._executor = None
+        self._canonical_method = None
+        self._lock = threading.Lock()
+        self.in_flight = 0  # submitted and not finished (running + queued)
+        self.completed = 0
+        self.rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+        self.workers = int(app.config.get('PASSWORD_HASH_WORKERS') or self.workers)
+        self.max_queue = int(app.config.get('PASSWORD_HASH_QUEUE_MAX', self.max_queue))
+        self._executor = None
+        self._canonical_method = None
+        app.extensions['password_hasher'] = self
+
+    @property
+    def queue_depth(self):
+        """Hashes waiting for a free worker"""
+        return max(0, self.in_flight - self.workers)
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingBusy('Too many concurrent password checks, please retry')
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+            self.in_flight += 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if pwhash was made with other parameters than the configured method"""
+        if self._canonical_method is None:
+            # 'scrypt' is stored as 'scrypt:32768:8:1' etc.; learn the full form once
+            self._canonical_method = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._canonical_method
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'queued': self.queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+
+password_hasher = PasswordHasher()
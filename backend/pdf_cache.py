@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Bump when the PDF layout changes so old renders are not served
+CACHE_FORMAT = 3
+
+
+def _file_signature(path):
+    """Cheap identity of a file on disk (size + mtime)"""
+    if not path or not os.path.isfile(path):
+        return None
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def invoice_fingerprint(invoice, user, logo_path=None, theme_color=None,
+                        currency_symbol=None, font_path=None, engine=None, bold_font_path=None):
+    """
+    Hash everything that affects the rendered PDF into a cache key.
+    """
+    payload = {
+        'format': CACHE_FORMAT,
+        'invoice': [
+            invoice.id, invoice.invoice_number, invoice.client_name,
+            invoice.client_email, invoice.client_address, invoice.invoice_date,
+            invoice.due_date, invoice.notes, invoice.subtotal, invoice.tax_rate,
+            invoice.tax_amount, invoice.total, invoice.status, invoice.updated_at,
+        ],
+        'items': [
+            [item.id, item.description, item.quantity, item.unit_price, item.total]
+            for item in invoice.items
+        ],
+        'user': [
+            user.company_name, user.full_name, user.email, user.phone,
+            user.address, user.company_logo,
+        ],
+        'logo': _file_signature(logo_path),
+        'font': [font_path, _file_signature(font_path)],
+        'bold_font': [bold_font_path, _file_signature(bold_font_path)],
+        'theme_color': theme_color,
+        'currency_symbol': currency_symbol,
+        'engine': engine or 'platypus',
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class PdfCache:
+    """
+    Size-capped on-disk LRU cache of rendered PDFs, keyed by fingerprint.
+
+    Concurrent requests for the same key are merged into a single render,
+    within a process (thread lock) and across gunicorn workers (flock).
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        self._guard = threading.Lock()
+        self._inflight = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get('PDF_CACHE_DIR')
+        self.max_bytes = int(app.config.get('PDF_CACHE_MAX_BYTES', 0))
+        if self.enabled:
+            os.makedirs(os.path.join(self.directory, 'locks'), exist_ok=True)
+        app.extensions['pdf_cache'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and self.max_bytes > 0
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        path = self.path_for(key)
+        try:
+            # mtime doubles as the LRU access time
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_render(self, key, render):
+        """Return a path to the PDF for key, calling render() only on a miss"""
+        with self._guard:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with lock, self._file_lock(key):
+                path = self.get(key)
+                if path is None:
+                    path = self._store(key, render())
+                return path
+        finally:
+            with self._guard:
+                self._inflight.pop(key, None)
+
+    def put(self, key, data):
+        """Store already-rendered bytes under key"""
+        return self._store(key, data)
+
+    def _file_lock(self, key):
+        return _FileLock(os.path.join(self.directory, 'locks', f"{key}.lock"))
+
+    def _store(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_path, self.path_for(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict(keep=key)
+        return self.path_for(key)
+
+    def _evict(self, keep=None):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.name))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            key = name[:-len('.pdf')]
+            if key == keep:
+                continue
+            for stale in (os.path.join(self.directory, name),
+                          os.path.join(self.directory, 'locks', f"{key}.lock")):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+
+class _FileLock:
+    """Exclusive advisory lock on a file, shared between worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fh = open(self.path, 'a')
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+pdf_cache = PdfCache()
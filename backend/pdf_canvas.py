@@ -0,0 +1,553 @@
+"""
+Canvas rendering engine for the standard invoice template.
+
+Draws the same page as the Platypus story in pdf_generator straight onto a
+reportlab.pdfgen canvas: column positions are fixed, text is measured with
+stringWidth and wrapped the way Paragraph wraps it, and pagination follows
+the rules the Platypus layout applies to this template (tables break
+between rows, a continued items table restarts its stripes, paragraphs
+break between lines but never leave a single line behind, spacers move to
+the next page whole). benchmarks/check_pdf_engines.py compares the two
+engines' output page by page.
+"""
+from io import BytesIO
+from reportlab.lib.enums import TA_RIGHT, TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+import logging
+import os
+from font_registry import font_registry
+from metrics import metrics
+from pdf_generator import FOOTER_TEXT, LARGE_INVOICE_ITEMS, _fmt_money, _logo_reader, get_theme
+
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+TABLE_LEFT = 2.5*cm
+TABLE_WIDTH = PAGE_WIDTH - 5*cm
+# The document frame sits inside the margins with 6pt of padding; tables
+# are wider than the frame and centered on it, so they start at the margin
+FRAME_LEFT = TABLE_LEFT + 6
+FRAME_WIDTH = TABLE_WIDTH - 12
+FRAME_TOP = PAGE_HEIGHT - 2*cm - 6
+FRAME_BOTTOM = 2*cm + 6
+FUZZ = 1e-6
+
+HEADER_COLUMNS = (TABLE_WIDTH * 0.55, TABLE_WIDTH * 0.45)
+DETAILS_COLUMNS = (3.5*cm, 3*cm)
+TOTALS_COLUMNS = (TABLE_WIDTH * 0.70, TABLE_WIDTH * 0.30)
+ITEM_COLUMNS = (TABLE_WIDTH * 0.50, TABLE_WIDTH * 0.16, TABLE_WIDTH * 0.17, TABLE_WIDTH * 0.17)
+# (left, right) padding of the items table cells
+ITEM_PADDING = ((12, 6), (6, 6), (6, 6), (6, 12))
+ITEM_LEFTS = tuple(TABLE_LEFT + sum(ITEM_COLUMNS[:n]) for n in range(4))
+LOGO_HEIGHT = 2.5*cm
+
+
+def wrap_text(text, font, size, width):
+    """
+    Break text into (line, line width) pairs exactly as a single-style
+    Paragraph does: whitespace collapses, words fill lines greedily (spaces
+    may shrink by 5%) and a word wider than a line is split by characters.
+    """
+    words = text.split()
+    space = stringWidth(' ', font, size)
+    shrink = 0.05 * space
+    lines, line, current = [], [], -space
+    pieces = 0  # how many of the next words are pieces of a split word
+    forced = False
+    while words:
+        word = words.pop(0)
+        piece = pieces > 0
+        if piece:
+            pieces -= 1
+            forced = forced or not word
+        word_width = stringWidth(word, font, size)
+        new_width = current + space + word_width
+        limit = width + shrink * len(line)
+        if new_width > limit and not (piece or forced) and word_width > width:
+            split = _split_word(word, current + space, width, font, size)
+            words[0:0] = split
+            pieces = len(split)
+            forced = True
+            continue
+        if new_width <= limit or not line or forced:
+            if word:
+                line.append(word)
+            if forced:
+                # The first piece of a split word ends its line
+                forced = False
+                lines.append((' '.join(line), new_width))
+                line, current = [], -space
+            else:
+                current = new_width
+        else:
+            lines.append((' '.join(line), current))
+            line, current = [word], word_width
+    if line:
+        lines.append((' '.join(line), current))
+    return lines
+
+
+def _split_word(word, used, width, font, size):
+    """Pieces of a too-long word; the first one fills what is left of the current line"""
+    pieces, piece, line_width = [], '', used
+    for char in word:
+        char_width = stringWidth(char, font, size)
+        if line_width + char_width > width and (piece or char_width <= width):
+            pieces.append(piece)
+            piece, line_width = '', 0
+        piece += char
+        line_width += char_width
+    pieces.append(piece)
+    return pieces
+
+
+class TextBlock:
+    """A measured paragraph: wrapped lines in one font, size and color."""
+
+    __slots__ = ('lines', 'font', 'size', 'leading', 'color', 'alignment', 'width', 'space_after')
+
+    def __init__(self, text, style, width, font=None):
+        self.font = font or style.fontName
+        self.size = style.fontSize
+        self.leading = style.leading
+        self.color = style.textColor
+        self.alignment = style.alignment
+        self.space_after = style.spaceAfter
+        self.width = width
+        self.lines = wrap_text(text, self.font, self.size, width) if text else []
+
+    @property
+    def height(self):
+        return len(self.lines) * self.leading
+
+    def part(self, start, stop=None):
+        """The same block with only lines[start:stop]"""
+        block = object.__new__(TextBlock)
+        for name in TextBlock.__slots__:
+            setattr(block, name, getattr(self, name))
+        block.lines = self.lines[start:stop]
+        return block
+
+
+class Gap:
+    """Fixed vertical space inside a table cell."""
+
+    space_after = 0
+
+    def __init__(self, height):
+        self.height = height
+
+
+class Logo:
+    """The company logo, scaled to LOGO_HEIGHT."""
+
+    space_after = 0
+    height = LOGO_HEIGHT
+
+    def __init__(self, reader):
+        image_width, image_height = reader.getSize()
+        self.reader = reader
+        self.width = LOGO_HEIGHT * image_width / float(image_height)
+
+
+def _stack_height(stack):
+    if not stack:
+        return 0
+    return sum(part.height + part.space_after for part in stack) - stack[-1].space_after
+
+
+class CanvasInvoice:
+    """Lays an invoice out top to bottom on a canvas, starting pages as it goes."""
+
+    def __init__(self, canv, theme, currency_symbol):
+        self.canv = canv
+        self.theme = theme
+        self.styles = theme.styles
+        self.currency_symbol = currency_symbol
+        self.y = FRAME_TOP
+        self.at_top = True
+        self._text = None
+        self._state = None
+
+    # ---- drawing ----
+
+    def new_page(self):
+        self.flush_text()
+        self.canv.showPage()
+        self.y = FRAME_TOP
+        self.at_top = True
+
+    def flush_text(self):
+        # A page's text goes into one text object, drawn over its fills and rules
+        if self._text is not None:
+            self.canv.drawText(self._text)
+            self._text = self._state = None
+
+    def text(self, x, y, string, font, size, color):
+        if self._text is None:
+            self._text = self.canv.beginText()
+        state = (font, size, color)
+        if state != self._state:
+            if self._state is None or self._state[:2] != state[:2]:
+                self._text.setFont(font, size)
+            self._text.setFillColor(color)
+            self._state = state
+        self._text.setTextOrigin(x, y)
+        self._text.textOut(string)
+
+    def draw_block(self, block, x, top):
+        """Draw a TextBlock whose first line starts `top`"""
+        baseline = top - block.size
+        for line, line_width in block.lines:
+            if block.alignment == TA_RIGHT:
+                line_x = x + block.width - line_width
+            elif block.alignment == TA_CENTER:
+                line_x = x + (block.width - line_width) / 2
+            else:
+                line_x = x
+            self.text(line_x, baseline, line, block.font, block.size, block.color)
+            baseline -= block.leading
+
+    def draw_stack(self, stack, x, top):
+        """Draw a table cell's contents top-aligned"""
+        for part in stack:
+            if isinstance(part, TextBlock):
+                self.draw_block(part, x, top)
+            elif isinstance(part, Logo):
+                self.canv.drawImage(part.reader, x, top - part.height, part.width, part.height, mask='auto')
+            top -= part.height + part.space_after
+
+    def fill(self, x, y, width, height, color):
+        self.canv.setFillColor(color)
+        self.canv.rect(x, y, width, height, stroke=0, fill=1)
+
+    def rules(self, ys, weight, color):
+        """Full-width horizontal rules at each of ys"""
+        canv = self.canv
+        canv.setStrokeColor(color)
+        canv.setLineWidth(weight)
+        canv.setLineCap(1)
+        canv.setLineJoin(1)
+        canv.lines([(TABLE_LEFT, y, TABLE_LEFT + TABLE_WIDTH, y) for y in ys])
+
+    # ---- flow ----
+
+    def fits(self, height):
+        return self.y - height >= FRAME_BOTTOM - FUZZ
+
+    def advance(self, height):
+        if height:
+            self.y -= height
+            self.at_top = False
+
+    def spacer(self, height):
+        if not self.fits(height) and not self.at_top:
+            self.new_page()
+        self.advance(height)
+
+    def paragraph(self, block, x=FRAME_LEFT):
+        """A paragraph in the page frame; splits between lines when two or more fit"""
+        while True:
+            if self.fits(block.height):
+                self.draw_block(block, x, self.y)
+                self.advance(block.height + block.space_after)
+                return
+            fit = int((self.y - FRAME_BOTTOM) / block.leading)
+            if fit <= 1 and not self.at_top:
+                self.new_page()
+                continue
+            fit = max(fit, 1)
+            self.draw_block(block.part(0, fit), x, self.y)
+            self.advance(fit * block.leading)
+            self.new_page()
+            block = block.part(fit)
+
+    def table(self, rows, draw_rows):
+        """
+        Place table rows (tuples starting with the row height), breaking
+        between rows. draw_rows(rows, top, first) draws one page's share;
+        first is False on continuation pages.
+        """
+        remaining = sum(row[0] for row in rows)
+        start, first = 0, True
+        while start < len(rows):
+            if self.fits(remaining):
+                draw_rows(rows[start:], self.y, first)
+                self.advance(remaining)
+                return
+            available = self.y - FRAME_BOTTOM
+            stop, height = start, 0
+            while stop < len(rows) and height + rows[stop][0] <= available:
+                height += rows[stop][0]
+                stop += 1
+            if stop == start:
+                if not self.at_top:
+                    self.new_page()
+                    continue
+                stop, height = start + 1, rows[start][0]  # a row taller than a page
+            draw_rows(rows[start:stop], self.y, first)
+            self.advance(height)
+            self.new_page()
+            remaining -= height
+            start, first = stop, False
+
+    # ---- sections ----
+
+    def header(self, user, logo):
+        styles, theme = self.styles, self.theme
+        left_width, right_width = HEADER_COLUMNS
+        left = []
+        if logo is not None:
+            left += [Logo(logo), Gap(8)]
+        company_name = (user.company_name or user.full_name or "Company").strip()
+        left += [
+            TextBlock(company_name, styles['CompanyName'], left_width),
+            Gap(4),
+            TextBlock("Invoice", styles['InvoiceTitle'], left_width),
+        ]
+        right = []
+        if getattr(user, 'company_name', None):
+            right.append(TextBlock(user.company_name, styles['CompanyInfo'], right_width, theme.FONT_BOLD))
+        for value in (getattr(user, 'email', None), getattr(user, 'phone', None), getattr(user, 'address', None)):
+            if value:
+                right.append(TextBlock(value, styles['CompanyInfo'], right_width))
+
+        def draw(rows, top, first):
+            self.draw_stack(left, TABLE_LEFT, top)
+            self.draw_stack(right, TABLE_LEFT + left_width, top)
+
+        self.table([(max(_stack_height(left), _stack_height(right)),)], draw)
+
+    def info(self, invoice):
+        styles, theme = self.styles, self.theme
+        left_width = HEADER_COLUMNS[0]
+        bill_to = [
+            TextBlock("Bill To:", styles['SectionLabel'], left_width),
+            TextBlock(invoice.client_name or "-", styles['NormalText'], left_width),
+        ]
+        if getattr(invoice, 'client_email', None):
+            bill_to.append(TextBlock(invoice.client_email, styles['NormalText'], left_width))
+        if getattr(invoice, 'client_address', None):
+            for line in invoice.client_address.strip().split('\n'):
+                if line.strip():
+                    bill_to.append(TextBlock(line.strip(), styles['NormalText'], left_width))
+
+        details = [("Invoice number:", invoice.invoice_number)]
+        for label, value in (("Invoice date:", getattr(invoice, 'invoice_date', None)),
+                             ("Due date:", getattr(invoice, 'due_date', None))):
+            if value:
+                details.append((label, value.strftime('%d/%m/%Y') if hasattr(value, 'strftime') else str(value)))
+        label_width, value_width = DETAILS_COLUMNS
+        detail_rows = []
+        for label, value in details:
+            label = TextBlock(label, styles['MetaLabel'], label_width, theme.FONT_BOLD)
+            value = TextBlock(value, styles['MetaValue'], value_width)
+            detail_rows.append((max(label.height, value.height) + 2, label, value))
+        details_left = TABLE_LEFT + TABLE_WIDTH - label_width - value_width
+
+        def draw(rows, top, first):
+            self.draw_stack(bill_to, TABLE_LEFT, top)
+            # Details rows: 1pt padding, contents bottom-aligned
+            for height, label, value in detail_rows:
+                bottom = top - height
+                self.draw_block(label, details_left, bottom + 1 + label.height)
+                self.draw_block(value, details_left + label_width, bottom + 1 + value.height)
+                top = bottom
+
+        height = max(_stack_height(bill_to), sum(row[0] for row in detail_rows))
+        self.table([(height,)], draw)
+
+    def _header_row(self):
+        style, bold = self.styles['TableHeader'], self.theme.FONT_BOLD
+        cells = [TextBlock(title, style, width - left - right, bold) for title, width, (left, right)
+                 in zip(("Items", "Quantity", "Price", "Amount"), ITEM_COLUMNS, ITEM_PADDING)]
+        return (max(cell.height for cell in cells) + 20, cells, 10, 10)
+
+    def _draw_item_cells(self, cells, bottom, height, top_padding, bottom_padding):
+        # VALIGN MIDDLE
+        for cell, x, (left, _) in zip(cells, ITEM_LEFTS, ITEM_PADDING):
+            self.draw_block(cell, x + left, bottom + (height + bottom_padding - top_padding + cell.height) / 2)
+
+    def items(self, invoice):
+        """The standard items table: Paragraph-style cells, broken between rows"""
+        theme, style, symbol = self.theme, self.styles['TableCell'], self.currency_symbol
+        widths = [width - left - right for width, (left, right) in zip(ITEM_COLUMNS, ITEM_PADDING)]
+        rows = [self._header_row()]
+        for item in invoice.items:
+            cells = [
+                TextBlock(item.description or "", style, widths[0]),
+                TextBlock(str(item.quantity), style, widths[1]),
+                TextBlock(_fmt_money(item.unit_price, symbol), style, widths[2]),
+                TextBlock(_fmt_money(item.total, symbol), style, widths[3]),
+            ]
+            rows.append((max(cell.height for cell in cells) + 16, cells, 8, 8))
+
+        def draw(rows, top, first):
+            # A continued table keeps the rule it was split on above its first row
+            bottoms, y = ([] if first else [top]), top
+            for n, (height, cells, top_padding, bottom_padding) in enumerate(rows):
+                y -= height
+                bottoms.append(y)
+                if first and n == 0:
+                    self.fill(TABLE_LEFT, y, TABLE_WIDTH, height, theme.ACCENT)
+                elif (n - first) % 2:
+                    # Stripes count from the first data row on each page
+                    self.fill(TABLE_LEFT, y, TABLE_WIDTH, height, theme.BG_LIGHT)
+                self._draw_item_cells(cells, y, height, top_padding, bottom_padding)
+            self.rules(bottoms, 0.5, theme.BORDER)
+
+        self.table(rows, draw)
+
+    def large_items(self, invoice):
+        """The large-invoice table: plain-string cells, header repeated on every page"""
+        theme, style, symbol = self.theme, self.styles['TableCell'], self.currency_symbol
+        font, text_color = theme.FONT_NAME, theme.TEXT
+        header = self._header_row()
+        text_width = ITEM_COLUMNS[0] - 12 - 6
+        rights = [x + width - 6 for x, width in zip(ITEM_LEFTS, ITEM_COLUMNS)]
+        rights[3] -= 6
+
+        def row(item):
+            description = item.description or ""
+            if '\n' in description or stringWidth(description, font, 9) > text_width:
+                description = TextBlock(description, style, text_width)
+                height = max(description.height, 13)
+            else:
+                height = 13
+            return (height + 16, description, str(item.quantity), _fmt_money(item.unit_price, symbol),
+                    _fmt_money(item.total, symbol))
+
+        items = invoice.items
+        index, pending = 0, None
+        while True:
+            page_rows, height = [], header[0]
+            while True:
+                if pending is None and index < len(items):
+                    pending = row(items[index])
+                    index += 1
+                if pending is None or self.y - height - pending[0] < FRAME_BOTTOM - FUZZ:
+                    break
+                page_rows.append(pending)
+                height += pending[0]
+                pending = None
+            if not page_rows and pending is not None and not self.at_top:
+                self.new_page()
+                continue
+            if not page_rows and pending is not None:
+                page_rows, height, pending = [pending], height + pending[0], None
+            first_index = index - len(page_rows) - (pending is not None)
+            self._draw_large_rows(header, page_rows, first_index, rights, font, text_color)
+            self.advance(height)
+            if pending is None and index >= len(items):
+                return
+            self.new_page()
+
+    def _draw_large_rows(self, header, rows, first_index, rights, font, text_color):
+        theme = self.theme
+        y = self.y - header[0]
+        self.fill(TABLE_LEFT, y, TABLE_WIDTH, header[0], theme.ACCENT)
+        self._draw_item_cells(header[1], y, header[0], 10, 10)
+        bottoms = [y]
+        for n, (height, description, quantity, price, amount) in enumerate(rows):
+            y -= height
+            bottoms.append(y)
+            if (first_index + n) % 2:
+                self.fill(TABLE_LEFT, y, TABLE_WIDTH, height, theme.BG_LIGHT)
+            if isinstance(description, TextBlock):
+                self.draw_block(description, ITEM_LEFTS[0] + 12, y + (height + description.height) / 2)
+            else:
+                self.text(ITEM_LEFTS[0] + 12, y + (height + 13) / 2 - 9, description, font, 9, text_color)
+            baseline = y + (height + 13) / 2 - 9
+            for right, value in zip(rights[1:], (quantity, price, amount)):
+                self.text(right - stringWidth(value, font, 9), baseline, value, font, 9, text_color)
+        self.rules(bottoms, 0.5, theme.BORDER)
+
+    def totals(self, invoice):
+        styles, theme, symbol = self.styles, self.theme, self.currency_symbol
+        label_width, value_width = TOTALS_COLUMNS[0] - 12, TOTALS_COLUMNS[1] - 12
+        rows = []
+        for label, value in (("Subtotal", invoice.subtotal),
+                             ("Tax (+)", getattr(invoice, 'tax_amount', 0) or 0),
+                             ("Discount (-)", getattr(invoice, 'discount', 0) or 0)):
+            label = TextBlock(label, styles['MetaLabel'], label_width)
+            value = TextBlock(_fmt_money(value, symbol), styles['MetaValue'], value_width)
+            rows.append((max(label.height, value.height) + 8, label, value, 4, False))
+        label = TextBlock("Total", styles['SectionLabel'], label_width)
+        value = TextBlock(_fmt_money(invoice.total, symbol), styles['SectionLabel'], value_width)
+        rows.append((max(label.height, value.height) + 16, label, value, 8, True))
+        before_total = rows[-2]
+
+        def draw(rows, top, first):
+            y = top
+            for row in rows:
+                height, label, value, padding, last = row
+                if last:
+                    self.rules([y], 1, theme.BORDER)
+                y -= height
+                # Contents bottom-aligned
+                self.draw_block(label, TABLE_LEFT, y + padding + label.height)
+                self.draw_block(value, TABLE_LEFT + TOTALS_COLUMNS[0], y + padding + value.height)
+                if row is before_total and row is rows[-1]:
+                    # The total went to the next page; its rule also closes this one
+                    self.rules([y], 1, theme.BORDER)
+
+        self.table(rows, draw)
+
+    def notes(self, invoice):
+        if getattr(invoice, 'notes', None) and invoice.notes.strip():
+            self.paragraph(TextBlock("Notes", self.styles['SectionLabel'], FRAME_WIDTH))
+            self.spacer(4)
+            self.paragraph(TextBlock(invoice.notes, self.styles['NormalText'], FRAME_WIDTH))
+            self.spacer(20)
+
+    def footer(self):
+        self.spacer(10)
+        self.paragraph(TextBlock(FOOTER_TEXT, self.styles['FooterNote'], FRAME_WIDTH))
+
+
+def render_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
+                       font_path=None, currency_symbol="$", large_table=None, bold_font_path=None):
+    """The canvas engine behind generate_invoice_pdf(engine='canvas')."""
+    clock = metrics.stopwatch('pdf_render_phase_seconds')
+    theme = get_theme(theme_color, *font_registry.faces(font_path, bold_font_path))
+    clock.lap('styles')
+
+    buffer = BytesIO()
+    canv = canvas.Canvas(buffer, pagesize=A4)
+    layout = CanvasInvoice(canv, theme, currency_symbol)
+
+    logo = None
+    if logo_path and os.path.isfile(logo_path):
+        clock.lap('story')
+        try:
+            logo = _logo_reader(logo_path)
+        except Exception:
+            logger.exception('Logo error')
+        clock.lap('logo')
+
+    if large_table is None:
+        large_table = len(invoice.items) > LARGE_INVOICE_ITEMS
+
+    layout.header(user, logo)
+    layout.spacer(20)
+    layout.info(invoice)
+    layout.spacer(20)
+    if large_table:
+        layout.large_items(invoice)
+    else:
+        layout.items(invoice)
+    layout.spacer(15)
+    layout.totals(invoice)
+    layout.spacer(25)
+    layout.notes(invoice)
+    layout.footer()
+    layout.flush_text()
+    clock.lap('story')
+
+    canv.save()
+    clock.lap('build')
+    clock.done()
+    return buffer.getvalue()
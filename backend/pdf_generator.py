@@ -4,12 +4,28 @@ from reportlab.lib import colors
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.enums import TA_RIGHT, TA_LEFT, TA_CENTER
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, KeepTogether
+    SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, KeepTogether, Flowable
 )
 from reportlab.lib.units import cm, mm
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
+from reportlab.lib.utils import ImageReader
+import logging
 import os
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from font_registry import font_registry
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Invoices with more line items than this use the large-invoice items table
+LARGE_INVOICE_ITEMS = 300
+# Rows laid out at a time by the large-invoice table (a little over one A4 page)
+LARGE_TABLE_CHUNK_ROWS = 32
+# Layout engines: the Platypus story below, or the direct canvas drawing in pdf_canvas
+PDF_ENGINES = ('platypus', 'canvas')
+FOOTER_TEXT = "Please pay the invoice before the due date. Let us know if you have any questions."
+
 
 def _fmt_money(v, symbol="$"):
     try:
@@ -17,118 +33,331 @@ def _fmt_money(v, symbol="$"):
     except Exception:
         return f"{symbol}{v}"
 
-def _register_font_if_exists(path, name="CustomFont"):
-    if not path or not os.path.isfile(path):
-        return None
-    try:
-        pdfmetrics.registerFont(TTFont(name, path))
-        return name
-    except Exception:
-        return None
+@lru_cache(maxsize=32)
+def _load_logo(path, mtime_ns, size):
+    """Read a logo file once per process; keyed by file identity so re-uploads miss."""
+    with open(path, 'rb') as fh:
+        return fh.read()
 
-def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
-                         font_path=None, currency_symbol="$"):
+def _logo_reader(path):
+    st = os.stat(path)
+    # A fresh reader per render: its file handle is not thread-safe. Logos
+    # are stored as JPEG (normalize_logo), which ReportLab embeds as-is.
+    return ImageReader(BytesIO(_load_logo(path, st.st_mtime_ns, st.st_size)))
+
+class LogoImage(Flowable):
+    """Draws a preloaded ImageReader scaled to a fixed height."""
+
+    def __init__(self, reader, height):
+        Flowable.__init__(self)
+        image_width, image_height = reader.getSize()
+        self.reader = reader
+        self.hAlign = 'CENTER'
+        self.drawHeight = height
+        self.drawWidth = height * image_width / float(image_height)
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
+class PagedItemsTable(Flowable):
     """
-    Generates a clean, well-aligned invoice PDF.
+    Items table for invoices with thousands of line items.
+
+    Cells are plain strings (descriptions become Paragraphs only when they
+    need wrapping) formatted as each page is laid out. Each page gets its own
+    LongTable of at most LARGE_TABLE_CHUNK_ROWS rows with the header
+    repeated, so a page break costs a chunk rather than the whole remaining
+    table, and memory stays flat.
     """
-    ACCENT = colors.HexColor(theme_color)
-    TEXT = colors.HexColor("#1f2937")
-    MUTED = colors.HexColor("#6b7280")
-    BORDER = colors.HexColor("#e5e7eb")
-    BG_LIGHT = colors.HexColor("#f9fafb")
 
-    FONT_NAME = _register_font_if_exists(font_path, "CustomFont") or "Helvetica"
-    FONT_BOLD = FONT_NAME + "-Bold" if FONT_NAME == "Helvetica" else FONT_NAME
+    def __init__(self, header, items, col_widths, theme, currency_symbol, start=0):
+        Flowable.__init__(self)
+        self.hAlign = 'CENTER'  # like the LongTable parts it hands to the frame
+        self.header = header
+        self.items = items
+        self.col_widths = col_widths
+        self.theme = theme
+        self.currency_symbol = currency_symbol
+        self.start = start  # first item on this (remaining) part of the table
+        self._table = None
+        self._count = 0
+        # Widest description that fits the first column on one line
+        self._text_width = col_widths[0] - 12 - 6
+
+    def _row(self, item):
+        description = item.description or ""
+        if '\n' in description or \
+                pdfmetrics.stringWidth(description, self.theme.FONT_NAME, 9) > self._text_width:
+            description = Paragraph(escape(description), self.theme.styles['TableCell'])
+        return [
+            description,
+            str(item.quantity),
+            _fmt_money(item.unit_price, self.currency_symbol),
+            _fmt_money(item.total, self.currency_symbol),
+        ]
+
+    def _chunk(self):
+        if self._table is None:
+            self._count = min(len(self.items) - self.start, LARGE_TABLE_CHUNK_ROWS)
+            chunk = self.items[self.start:self.start + self._count]
+            rows = [self.header] + [self._row(item) for item in chunk]
+            self._table = LongTable(rows, colWidths=self.col_widths, repeatRows=1,
+                                    style=self.theme.large_items_table_styles[self.start % 2])
+        return self._table
+
+    def wrap(self, availWidth, availHeight):
+        width, height = self._chunk().wrap(availWidth, availHeight)
+        if self.start + self._count < len(self.items):
+            # More rows follow this chunk: never claim to fit, so the frame splits us
+            height = max(height, availHeight + 1)
+        return width, height
+
+    def split(self, availWidth, availHeight):
+        table = self._chunk()
+        parts = table.split(availWidth, availHeight)
+        if not parts:
+            return []
+        used = len(parts[0]._cellvalues) - 1 if len(parts) > 1 else self._count
+        if self.start + used >= len(self.items):
+            return [parts[0]]
+        return [parts[0], PagedItemsTable(self.header, self.items, self.col_widths, self.theme,
+                                          self.currency_symbol, self.start + used)]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
 
-    styles = getSampleStyleSheet()
+class Theme:
+    """Compiled colors, paragraph styles and table styles for one theme color and font pair."""
+
+    def __init__(self, theme_color, font_name="Helvetica", bold_font_name="Helvetica-Bold"):
+        self.ACCENT = colors.HexColor(theme_color)
+        self.TEXT = colors.HexColor("#1f2937")
+        self.MUTED = colors.HexColor("#6b7280")
+        self.BORDER = colors.HexColor("#e5e7eb")
+        self.BG_LIGHT = colors.HexColor("#f9fafb")
+
+        # Registered font names (see font_registry), not file paths
+        self.FONT_NAME = font_name
+        self.FONT_BOLD = bold_font_name
+
+        self.styles = self._build_styles()
+        self._build_table_styles()
+
+    def _build_styles(self):
+        ACCENT, TEXT, MUTED = self.ACCENT, self.TEXT, self.MUTED
+        FONT_NAME, FONT_BOLD = self.FONT_NAME, self.FONT_BOLD
+
+        styles = getSampleStyleSheet()
     
-    # Define consistent styles
-    styles.add(ParagraphStyle(
-        'CompanyName',
-        fontName=FONT_BOLD,
-        fontSize=24,
-        textColor=ACCENT,
-        leading=28,
-        spaceAfter=2
-    ))
+        # Define consistent styles
+        styles.add(ParagraphStyle(
+            'CompanyName',
+            fontName=FONT_BOLD,
+            fontSize=24,
+            textColor=ACCENT,
+            leading=28,
+            spaceAfter=2
+        ))
     
-    styles.add(ParagraphStyle(
-        'InvoiceTitle',
-        fontName=FONT_NAME,
-        fontSize=16,
-        textColor=ACCENT,
-        leading=20,
-        spaceAfter=8
-    ))
+        styles.add(ParagraphStyle(
+            'InvoiceTitle',
+            fontName=FONT_NAME,
+            fontSize=16,
+            textColor=ACCENT,
+            leading=20,
+            spaceAfter=8
+        ))
     
-    styles.add(ParagraphStyle(
-        'CompanyInfo',
-        fontName=FONT_NAME,
-        fontSize=9,
-        textColor=MUTED,
-        leading=13,
-        alignment=TA_RIGHT
-    ))
+        styles.add(ParagraphStyle(
+            'CompanyInfo',
+            fontName=FONT_NAME,
+            fontSize=9,
+            textColor=MUTED,
+            leading=13,
+            alignment=TA_RIGHT
+        ))
     
-    styles.add(ParagraphStyle(
-        'SectionLabel',
-        fontName=FONT_BOLD,
-        fontSize=10,
-        textColor=TEXT,
-        leading=14,
-        spaceAfter=4
-    ))
+        styles.add(ParagraphStyle(
+            'SectionLabel',
+            fontName=FONT_BOLD,
+            fontSize=10,
+            textColor=TEXT,
+            leading=14,
+            spaceAfter=4
+        ))
     
-    styles.add(ParagraphStyle(
-        'NormalText',
-        fontName=FONT_NAME,
-        fontSize=9,
-        textColor=TEXT,
-        leading=13
-    ))
+        styles.add(ParagraphStyle(
+            'NormalText',
+            fontName=FONT_NAME,
+            fontSize=9,
+            textColor=TEXT,
+            leading=13
+        ))
     
-    styles.add(ParagraphStyle(
-        'MetaLabel',
-        fontName=FONT_NAME,
-        fontSize=9,
-        textColor=TEXT,
-        leading=13,
-        alignment=TA_RIGHT
-    ))
+        styles.add(ParagraphStyle(
+            'MetaLabel',
+            fontName=FONT_NAME,
+            fontSize=9,
+            textColor=TEXT,
+            leading=13,
+            alignment=TA_RIGHT
+        ))
     
-    styles.add(ParagraphStyle(
-        'MetaValue',
-        fontName=FONT_NAME,
-        fontSize=9,
-        textColor=TEXT,
-        leading=13,
-        alignment=TA_RIGHT
-    ))
+        styles.add(ParagraphStyle(
+            'MetaValue',
+            fontName=FONT_NAME,
+            fontSize=9,
+            textColor=TEXT,
+            leading=13,
+            alignment=TA_RIGHT
+        ))
     
-    styles.add(ParagraphStyle(
-        'TableHeader',
-        fontName=FONT_BOLD,
-        fontSize=10,
-        textColor=colors.white,
-        leading=14
-    ))
+        styles.add(ParagraphStyle(
+            'TableHeader',
+            fontName=FONT_BOLD,
+            fontSize=10,
+            textColor=colors.white,
+            leading=14
+        ))
     
-    styles.add(ParagraphStyle(
-        'TableCell',
-        fontName=FONT_NAME,
-        fontSize=9,
-        textColor=TEXT,
-        leading=13
-    ))
+        styles.add(ParagraphStyle(
+            'TableCell',
+            fontName=FONT_NAME,
+            fontSize=9,
+            textColor=TEXT,
+            leading=13
+        ))
     
-    styles.add(ParagraphStyle(
-        'FooterNote',
-        fontName=FONT_NAME,
-        fontSize=8,
-        textColor=MUTED,
-        leading=11,
-        alignment=TA_CENTER
-    ))
+        styles.add(ParagraphStyle(
+            'FooterNote',
+            fontName=FONT_NAME,
+            fontSize=8,
+            textColor=MUTED,
+            leading=11,
+            alignment=TA_CENTER
+        ))
+
+        return styles
+
+    def _build_table_styles(self):
+        self.header_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ])
+
+        self.details_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ])
+
+        self.info_section_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ])
+
+        self.items_table_style = TableStyle([
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), self.ACCENT),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), self.FONT_BOLD),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('LEFTPADDING', (0, 0), (0, -1), 12),
+            ('RIGHTPADDING', (-1, 0), (-1, -1), 12),
+            
+            # Data rows
+            ('FONTNAME', (0, 1), (-1, -1), self.FONT_NAME),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+            ('LEFTPADDING', (0, 1), (0, -1), 12),
+            ('RIGHTPADDING', (-1, 1), (-1, -1), 12),
+            
+            # Alignment
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            
+            # Grid
+            ('LINEBELOW', (0, 0), (-1, -1), 0.5, self.BORDER),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.BG_LIGHT]),
+        ])
+
+        # Large invoices: same look with plain-string cells (text color and
+        # leading of the TableCell style). One style per shading phase, so a
+        # page that starts on an odd row keeps the stripes in step.
+        large_commands = [cmd for cmd in self.items_table_style.getCommands() if cmd[0] != 'ROWBACKGROUNDS']
+        large_commands += [
+            ('TEXTCOLOR', (0, 1), (-1, -1), self.TEXT),
+            ('LEADING', (0, 1), (-1, -1), 13),
+        ]
+        self.large_items_table_styles = (
+            TableStyle(large_commands + [('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.BG_LIGHT])]),
+            TableStyle(large_commands + [('ROWBACKGROUNDS', (0, 1), (-1, -1), [self.BG_LIGHT, colors.white])]),
+        )
+
+        self.totals_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -2), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -2), 4),
+            ('TOPPADDING', (0, -1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
+            ('LINEABOVE', (0, -1), (-1, -1), 1, self.BORDER),
+        ])
+
+
+@lru_cache(maxsize=32)
+def get_theme(theme_color, font_name="Helvetica", bold_font_name="Helvetica-Bold"):
+    """Return the process-wide compiled Theme for a theme color and registered font pair."""
+    return Theme(theme_color, font_name, bold_font_name)
+
+
+def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
+                         font_path=None, currency_symbol="$", large_table=None, engine=None,
+                         bold_font_path=None):
+    """
+    Generates a clean, well-aligned invoice PDF.
+
+    large_table picks the items table layout; by default invoices with more
+    than LARGE_INVOICE_ITEMS lines get the paged plain-string table.
+    engine is 'platypus' (the default) or 'canvas', which draws the same
+    page several times faster (see pdf_canvas). font_path and bold_font_path
+    are TTF files (default Helvetica), loaded once per process.
+    """
+    if engine == 'canvas':
+        from pdf_canvas import render_invoice_pdf
+        return render_invoice_pdf(invoice, user, logo_path=logo_path, theme_color=theme_color,
+                                  font_path=font_path, currency_symbol=currency_symbol,
+                                  large_table=large_table, bold_font_path=bold_font_path)
+    if engine not in (None, 'platypus'):
+        raise ValueError(f"Unknown PDF engine {engine!r}; expected one of {', '.join(PDF_ENGINES)}")
+
+    clock = metrics.stopwatch('pdf_render_phase_seconds')
+    theme = get_theme(theme_color, *font_registry.faces(font_path, bold_font_path))
+    styles = theme.styles
+    clock.lap('styles')
 
     # Create PDF
     buffer = BytesIO()
@@ -151,15 +380,13 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
     
     # Left side: Logo and Company Name
     if logo_path and os.path.isfile(logo_path):
+        clock.lap('story')
         try:
-            img = Image(logo_path)
-            aspect = img.imageWidth / float(img.imageHeight)
-            img.drawHeight = 2.5*cm
-            img.drawWidth = 2.5*cm * aspect
-            left_content.append(img)
+            left_content.append(LogoImage(_logo_reader(logo_path), 2.5*cm))
             left_content.append(Spacer(1, 8))
-        except Exception as e:
-            print(f"Logo error: {e}")
+        except Exception:
+            logger.exception('Logo error')
+        clock.lap('logo')
     
     # Company name
     company_name = (user.company_name or user.full_name or "Company").strip()
@@ -181,15 +408,7 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
         [[left_content, right_content]],
         colWidths=[page_width * 0.55, page_width * 0.45]
     )
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    header_table.setStyle(theme.header_table_style)
     story.append(header_table)
     story.append(Spacer(1, 20))
 
@@ -230,27 +449,13 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
         ])
     
     details_table = Table(invoice_details, colWidths=[3.5*cm, 3*cm])
-    details_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 1),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-    ]))
+    details_table.setStyle(theme.details_table_style)
     
     info_section = Table(
         [[bill_to_content, details_table]],
         colWidths=[page_width * 0.55, page_width * 0.45]
     )
-    info_section.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    info_section.setStyle(theme.info_section_style)
     story.append(info_section)
     story.append(Spacer(1, 20))
 
@@ -262,47 +467,23 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
         Paragraph("<b>Amount</b>", styles['TableHeader'])
     ]]
     
-    for item in invoice.items:
-        items_data.append([
-            Paragraph(item.description or "", styles['TableCell']),
-            Paragraph(str(item.quantity), styles['TableCell']),
-            Paragraph(_fmt_money(item.unit_price, currency_symbol), styles['TableCell']),
-            Paragraph(_fmt_money(item.total, currency_symbol), styles['TableCell'])
-        ])
-    
-    items_table = Table(
-        items_data,
-        colWidths=[page_width * 0.50, page_width * 0.16, page_width * 0.17, page_width * 0.17]
-    )
+    items_widths = [page_width * 0.50, page_width * 0.16, page_width * 0.17, page_width * 0.17]
+    if large_table is None:
+        large_table = len(invoice.items) > LARGE_INVOICE_ITEMS
     
-    items_table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), ACCENT),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('LEFTPADDING', (0, 0), (0, -1), 12),
-        ('RIGHTPADDING', (-1, 0), (-1, -1), 12),
-        
-        # Data rows
-        ('FONTNAME', (0, 1), (-1, -1), FONT_NAME),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-        ('LEFTPADDING', (0, 1), (0, -1), 12),
-        ('RIGHTPADDING', (-1, 1), (-1, -1), 12),
-        
-        # Alignment
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    if large_table:
+        items_table = PagedItemsTable(items_data[0], list(invoice.items), items_widths, theme, currency_symbol)
+    else:
+        for item in invoice.items:
+            items_data.append([
+                Paragraph(item.description or "", styles['TableCell']),
+                Paragraph(str(item.quantity), styles['TableCell']),
+                Paragraph(_fmt_money(item.unit_price, currency_symbol), styles['TableCell']),
+                Paragraph(_fmt_money(item.total, currency_symbol), styles['TableCell'])
+            ])
         
-        # Grid
-        ('LINEBELOW', (0, 0), (-1, -1), 0.5, BORDER),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, BG_LIGHT]),
-    ]))
+        items_table = Table(items_data, colWidths=items_widths)
+        items_table.setStyle(theme.items_table_style)
     
     story.append(items_table)
     story.append(Spacer(1, 15))
@@ -337,17 +518,7 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
     ])
     
     totals_table = Table(totals_data, colWidths=[page_width * 0.70, page_width * 0.30])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -2), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -2), 4),
-        ('TOPPADDING', (0, -1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
-        ('LINEABOVE', (0, -1), (-1, -1), 1, BORDER),
-    ]))
+    totals_table.setStyle(theme.totals_table_style)
     
     story.append(totals_table)
     story.append(Spacer(1, 25))
@@ -360,12 +531,14 @@ def generate_invoice_pdf(invoice, user, logo_path=None, theme_color="#0ea5e4",
         story.append(Spacer(1, 20))
 
     # ========== FOOTER ==========
-    footer_text = "Please pay the invoice before the due date. Let us know if you have any questions."
     story.append(Spacer(1, 10))
-    story.append(Paragraph(footer_text, styles['FooterNote']))
+    story.append(Paragraph(FOOTER_TEXT, styles['FooterNote']))
 
     # Build PDF
+    clock.lap('story')
     doc.build(story)
+    clock.lap('build')
+    clock.done()
     pdf_bytes = buffer.getvalue()
     buffer.close()
     return pdf_bytes
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from bulk_export import get_render_pool, render_snapshot, snapshot_invoice, snapshot_user
+from pdf_generator import PDF_ENGINES, generate_invoice_pdf
+
+RENDER_MODES = ('inline', 'thread', 'process')
+
+
+class PdfRenderBusy(RuntimeError):
+    """Too many renders queued; the caller should answer 503 and let the client retry"""
+
+
+class PdfRenderer:
+    """
+    Renders single invoice PDFs for the download endpoint.
+
+    inline:  ReportLab runs on the request thread (one PDF per sync worker).
+    thread:  renders run on a small thread pool, capping how many of a
+             worker's threads can be busy building PDFs at once.
+    process: renders run in the shared spawn-based render pool, so the
+             request thread just waits on a future without holding the GIL
+             and a threaded worker keeps serving JSON meanwhile.
+
+    In the pooled modes, once more than `max_queue` renders are waiting
+    new ones are rejected with PdfRenderBusy instead of piling up; so is a
+    render that takes longer than `timeout` seconds. A timed-out render
+    counts as in flight until it actually finishes, since it still holds
+    a worker.
+    """
+
+    def __init__(self, app=None):
+        self.mode = 'inline'
+        self.workers = os.cpu_count() or 1
+        self.max_queue = 32
+        self.timeout = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        mode = app.config.get('PDF_RENDER_MODE') or 'inline'
+        if mode not in RENDER_MODES:
+            raise RuntimeError(f"PDF_RENDER_MODE must be one of {', '.join(RENDER_MODES)}, not {mode!r}")
+        self.mode = mode
+        engine = app.config.get('PDF_ENGINE') or 'platypus'
+        if engine not in PDF_ENGINES:
+            raise RuntimeError(f"PDF_ENGINE must be one of {', '.join(PDF_ENGINES)}, not {engine!r}")
+        self.workers = int(app.config.get('PDF_RENDER_WORKERS') or self.workers)
+        self.max_queue = int(app.config.get('PDF_RENDER_QUEUE_MAX', self.max_queue))
+        self.timeout = app.config.get('PDF_RENDER_TIMEOUT') or None
+        self._executor = None
+        app.extensions['pdf_renderer'] = self
+
+    @property
+    def queue_depth(self):
+        """Renders waiting for a free worker"""
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self):
+        if self.mode == 'process':
+            # Shared with bulk exports, so one set of render processes per worker
+            return get_render_pool(self.workers)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-render')
+        return self._executor
+
+    def render(self, invoice, user, options):
+        """PDF bytes for invoice, rendered according to the configured mode"""
+        if self.mode == 'inline':
+            return generate_invoice_pdf(invoice, user, **options)
+
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise PdfRenderBusy('Too many PDFs being rendered, please retry')
+            executor = self._get_executor()
+            self.in_flight += 1
+        try:
+            # Detached copies: ORM rows can't be pickled or lazy-load off the request thread
+            future = executor.submit(render_snapshot, snapshot_invoice(invoice), snapshot_user(user), options)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            pdf = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise PdfRenderBusy('PDF rendering timed out, please retry')
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return pdf
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'queued': self.queue_depth,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timed_out': self.timed_out,
+                'rejected': self.rejected
+            }
+
+
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_active_counters = ContextVar('active_query_counters', default=())
+
+
+class QueryCount:
+    """Number of SQL statements executed while a count_queries() block was active"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __int__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"<QueryCount {self.count}>"
+
+
+@contextmanager
+def count_queries():
+    """
+    Count statements executed inside the block (for tests and benchmarks).
+
+        with count_queries() as queries:
+            client.get('/api/invoices/1', headers=headers)
+        assert queries.count <= 2, queries.statements
+    """
+    counter = QueryCount()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in _active_counters.get():
+        counter.count += 1
+        counter.statements.append(statement)
+    if has_app_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is not None and has_app_context():
+        g.sql_query_seconds = g.get('sql_query_seconds', 0.0) + time.perf_counter() - started
+
+
+class QueryCounter:
+    """
+    Per-request SQL statement counter.
+
+    Every statement on any engine is counted (and timed) into flask.g; when
+    SQL_QUERY_COUNT_HEADER is on (default in debug/testing) the total is
+    returned as an X-Query-Count response header.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.config.setdefault('SQL_QUERY_COUNT_HEADER', None)
+
+        @app.after_request
+        def add_query_count_header(response):
+            enabled = app.config['SQL_QUERY_COUNT_HEADER']
+            if enabled is None:
+                enabled = app.debug or app.testing
+            if enabled:
+                response.headers['X-Query-Count'] = str(g.get('sql_query_count', 0))
+            return response
+
+        app.extensions['query_counter'] = self
+
+
+query_counter = QueryCounter()
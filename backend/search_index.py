@@ -0,0 +1,150 @@
+"""
+Full-text search over invoices (client name/email, notes, item descriptions).
+
+Each invoice has one document in the ``invoice_search`` table: an FTS5 table
+on SQLite, a weighted tsvector with a GIN index on PostgreSQL. Writes refresh
+the document in the caller's transaction, so results never lag behind edits.
+"""
+import re
+
+from sqlalchemy import DDL, bindparam, event, text
+
+from models import db
+
+SEARCH_TABLE = 'invoice_search'
+
+# Longer queries add little precision and make the match expensive
+MAX_TERMS = 16
+_TERM_RE = re.compile(r'[^\W_]+')
+
+# SQLite: rowid is the invoice id. 'owner' holds "u<user_id>" so the per-user
+# filter is answered by the FTS index itself rather than by scanning every
+# user's matches.
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS invoice_search USING fts5("
+    "owner, client_name, client_email, notes, items, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+
+_POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS invoice_search ("
+    "invoice_id INTEGER PRIMARY KEY REFERENCES invoices (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL, "
+    "document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_invoice_search_document ON invoice_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_invoice_search_user_id ON invoice_search (user_id)",
+]
+
+# db.create_all() / drop_all() manage the search table alongside the models
+for _statement in _SQLITE_DDL:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in _POSTGRES_DDL:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'before_drop', DDL("DROP TABLE IF EXISTS invoice_search"))
+
+_SQLITE_INDEX = """
+    INSERT OR REPLACE INTO invoice_search (rowid, owner, client_name, client_email, notes, items)
+    SELECT i.id, 'u' || i.user_id, i.client_name, i.client_email, i.notes,
+           (SELECT group_concat(it.description, ' ') FROM invoice_items it WHERE it.invoice_id = i.id)
+    FROM invoices i
+    WHERE {where}
+"""
+
+
+def _pg_text(expr):
+    # Split on punctuation like the query side does, so "acme.com" matches "acme"
+    return rf"to_tsvector('simple', regexp_replace(coalesce({expr}, ''), '[^[\:alnum\:]]+', ' ', 'g'))"
+
+
+_POSTGRES_INDEX = f"""
+    INSERT INTO invoice_search (invoice_id, user_id, document)
+    SELECT i.id, i.user_id,
+           setweight({_pg_text('i.client_name')}, 'A') ||
+           setweight({_pg_text('i.client_email')}, 'A') ||
+           setweight({_pg_text('i.notes')}, 'B') ||
+           setweight({_pg_text(
+               "(SELECT string_agg(it.description, ' ') FROM invoice_items it WHERE it.invoice_id = i.id)"
+           )}, 'C')
+    FROM invoices i
+    WHERE {{where}}
+    ON CONFLICT (invoice_id) DO UPDATE
+    SET user_id = EXCLUDED.user_id, document = EXCLUDED.document
+"""
+
+_SQLITE_SEARCH = """
+    SELECT rowid FROM invoice_search
+    WHERE invoice_search MATCH :match
+    ORDER BY bm25(invoice_search, 0.0, 10.0, 10.0, 4.0, 1.0), rowid DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+_POSTGRES_SEARCH = """
+    SELECT invoice_id FROM invoice_search, to_tsquery('simple', :tsquery) AS query
+    WHERE user_id = :user_id AND document @@ query
+    ORDER BY ts_rank(document, query) DESC, invoice_id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def _is_postgres():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def parse_search_terms(query):
+    """Split a user query into lowercase word terms (raises ValueError if there are none)"""
+    terms = _TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+    if not terms:
+        raise ValueError('Search query must contain letters or digits')
+    return terms
+
+
+def _index(where, params, *bind_params):
+    sql = _POSTGRES_INDEX if _is_postgres() else _SQLITE_INDEX
+    db.session.flush()
+    db.session.execute(text(sql.format(where=where)).bindparams(*bind_params), params)
+
+
+def index_invoice(invoice_id):
+    """(Re)build the search document of one invoice from its saved row and items"""
+    _index('i.id = :invoice_id', {'invoice_id': invoice_id})
+
+
+def index_invoices(invoice_ids):
+    """Build search documents for many invoices with one statement (bulk imports)"""
+    if invoice_ids:
+        _index('i.id IN :invoice_ids', {'invoice_ids': list(invoice_ids)},
+               bindparam('invoice_ids', expanding=True))
+
+
+def remove_invoice(invoice_id):
+    """Drop an invoice's search document (PostgreSQL does this via ON DELETE CASCADE)"""
+    if not _is_postgres():
+        db.session.execute(text("DELETE FROM invoice_search WHERE rowid = :invoice_id"),
+                           {'invoice_id': invoice_id})
+
+
+def rebuild_search_index(user_id=None):
+    """Recompute search documents from the invoices table (for backfills and repairs)"""
+    if user_id is None:
+        db.session.execute(text("DELETE FROM invoice_search"))
+        _index('1 = 1', {})
+        return
+
+    column = 'user_id' if _is_postgres() else 'owner'
+    value = user_id if _is_postgres() else f"u{user_id}"
+    db.session.execute(text(f"DELETE FROM invoice_search WHERE {column} = :value"), {'value': value})
+    _index('i.user_id = :user_id', {'user_id': user_id})
+
+
+def search_invoice_ids(user_id, terms, limit, offset=0):
+    """Ids of the user's invoices matching every term (the last one as a prefix), best first"""
+    params = {'limit': limit, 'offset': offset}
+    if _is_postgres():
+        sql = _POSTGRES_SEARCH
+        params['user_id'] = int(user_id)
+        params['tsquery'] = ' & '.join(terms) + ':*'
+    else:
+        sql = _SQLITE_SEARCH
+        words = ' AND '.join(f'"{term}"' for term in terms) + '*'
+        params['match'] = f"owner : \"u{int(user_id)}\" AND {{client_name client_email notes items}} : ({words})"
+    return db.session.execute(text(sql), params).scalars().all()
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, User
+
+
+class UserCache:
+    """
+    Per-process TTL + LRU cache of user profiles for authenticated requests.
+
+    Entries are detached copies of the User row; each hit is merged into the
+    request's session without a query, so callers get an ordinary persistent
+    User. Access tokens carry the profile_version they were issued for: a
+    token newer than the cached copy (the profile was edited, possibly in
+    another worker) forces a reload.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.max_size = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, detached User)
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = float(app.config.get('USER_CACHE_TTL', 0))
+        self.max_size = int(app.config.get('USER_CACHE_MAX_SIZE', 0))
+        app.extensions['user_cache'] = self
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, user_id, min_version=None):
+        """Return the User for user_id (None if it does not exist)"""
+        user_id = int(user_id)
+        if not self.enabled:
+            return db.session.get(User, user_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and \
+                    (min_version is None or entry[1].profile_version >= min_version):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                cached = entry[1]
+            else:
+                self.misses += 1
+                cached = None
+
+        if cached is not None:
+            return db.session.merge(cached, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self._store(user, now)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _store(self, user, now):
+        # A detached copy of the loaded columns, so the cache never shares
+        # state with a session
+        copy = User()
+        for attr in db.inspect(User).column_attrs:
+            set_committed_value(copy, attr.key, getattr(user, attr.key))
+        make_transient_to_detached(copy)
+
+        with self._lock:
+            self._entries[user.id] = (now + self.ttl, copy)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+user_cache = UserCache()
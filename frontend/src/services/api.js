@@ -55,8 +55,11 @@ export default {
   },
 
   // Invoices
-  getInvoices() {
-    return api.get('/invoices')
+  getInvoices(params = {}) {
+    return api.get('/invoices', { params })
+  },
+  searchInvoices(q, params = {}) {
+    return api.get('/invoices/search', { params: { ...params, q } })
   },
   getInvoice(id) {
     return api.get(`/invoices/${id}`)
@@ -120,6 +120,8 @@ export const useAuthStore = defineStore('auth', {
   }
 })
 
+const LIST_FIELDS = 'invoice_number,status,client_name,invoice_date,total'
+
 /**
  * Invoice store
  * - Fetch invoices, fetch single invoice, create/update/delete, download PDF
@@ -128,16 +130,19 @@ export const useAuthStore = defineStore('auth', {
 export const useInvoiceStore = defineStore('invoice', {
   state: () => ({
     invoices: [],
+    nextCursor: null,
     currentInvoice: null,
     loading: false
   }),
 
   actions: {
+    // list view only needs the card fields; pages are fetched with a keyset cursor
     async fetchInvoices() {
       this.loading = true
       try {
-        const response = await api.getInvoices()
+        const response = await api.getInvoices({ fields: LIST_FIELDS })
         this.invoices = response.data.invoices
+        this.nextCursor = response.data.next_cursor
       } catch (error) {
         throw error.response?.data || error
       } finally {
@@ -145,6 +150,17 @@ export const useInvoiceStore = defineStore('invoice', {
       }
     },
 
+    async fetchMoreInvoices() {
+      if (!this.nextCursor) return
+      try {
+        const response = await api.getInvoices({ fields: LIST_FIELDS, cursor: this.nextCursor })
+        this.invoices.push(...response.data.invoices)
+        this.nextCursor = response.data.next_cursor
+      } catch (error) {
+        throw error.response?.data || error
+      }
+    },
+
     async fetchInvoice(id) {
       this.loading = true
       try {